@@ -0,0 +1,388 @@
+#! /usr/bin/env python3
+
+# SPDX-FileCopyrightText: 2026 The P4 Language Consortium
+#
+# SPDX-License-Identifier: Apache-2.0
+
+# Micro-benchmarks of the pretext preprocessor of the P4_14 spec
+# versions.  Each one runs the current code against a copy of the code
+# it replaced, kept here, on input taken from a version's p4.pt.  The
+# timed ones check that both give the same result and print the best
+# of several runs of each; the memory one prints the peak of each.
+
+import argparse
+import filecmp
+import glob
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+import pretextlib
+
+root = os.path.dirname(os.path.abspath(__file__))
+
+parser = argparse.ArgumentParser(description="""
+Time parts of the pretext preprocessor before and after they were
+optimized.
+""")
+parser.add_argument('benchmarks', metavar='benchmark', nargs='*',
+                    help='the benchmarks to run (default: all of them)')
+parser.add_argument('--version', default='v1.0.5',
+                    help='the spec version whose pretext.py and p4.pt '
+                    'are used (default: %(default)s)')
+parser.add_argument('-c', '--copies', type=int, default=20,
+                    help='the number of copies of p4.pt the whole-document '
+                    'benchmarks process (default: %(default)s)')
+parser.add_argument('--lines', type=int, default=100000,
+                    help='the length of the synthetic input of the scrape '
+                    'benchmark (default: %(default)s)')
+parser.add_argument('--python', default='python2',
+                    help='the Python that runs pretext.py in the stream '
+                    'benchmark; the old pretext.py needs Python 2 '
+                    '(default: %(default)s)')
+parser.add_argument('--old-rev', default='200bbed',
+                    help='the git revision of the pretext.py the stream '
+                    'benchmark compares with, from before it streamed its '
+                    'input (default: %(default)s)')
+parser.add_argument('-r', '--repeat', type=int, default=5,
+                    help='the number of runs of each variant, of which '
+                    'the fastest counts (default: %(default)s)')
+
+
+def best_time(function, repeat):
+    """
+    Return the result of calling function, and the shortest time a
+    call took
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return result, best
+
+
+def compare(name, unit, count, variants, repeat):
+    """
+    Run each (label, function) variant, print how many units of work
+    it does per second, and exit if they do not all return the same
+    """
+    results = []
+    for label, function in variants:
+        result, elapsed = best_time(function, repeat)
+        results.append(result)
+        print('%-10s %-10s %12.0f %s/s' % (name, label, count / elapsed,
+                                          unit))
+    if any(result != results[0] for result in results[1:]):
+        sys.exit('%s: the variants give different results' % (name))
+
+
+def tagged_lines(fname, start, end):
+    """
+    Return the lines of fname between the tags start and end
+    """
+    lines = []
+    within = False
+    with open(fname) as infile:
+        for line in infile:
+            key = line.strip()
+            if key == start:
+                within = True
+            elif key == end:
+                within = False
+            elif within:
+                lines.append(line)
+    return lines
+
+
+def document_lines(texdir, copies):
+    """
+    Return the lines of copies of a version's p4.pt, one after another
+    """
+    with open(os.path.join(texdir, 'p4.pt')) as infile:
+        return infile.readlines() * copies
+
+
+def subn_replacements(module):
+    """
+    The BNF highlighter as it was: the replacement tables applied one
+    after another, then one re.subn per terminal
+    """
+    def bnf_replacements(line):
+        for s, r in module.bnf_bracket_replacements.items():
+            line = line.replace(s, r)
+        for s, r in module.bnf_simple_replacements.items():
+            line = line.replace(s, r)
+        for k in module.bnf_terminals:
+            exp = "\\b" + k + "\\b"
+            new = "@\\\\textbf{" + k + "}@"
+            new = new.replace("_", "\\_")
+            (line, _) = re.subn(exp, new, line)
+        return line
+    return bnf_replacements
+
+
+def glued_lines(module):
+    """
+    Return lines made of the terminals and of the entries of the
+    replacement tables glued to each other, two or three at a time,
+    where replacing one changes whether the next is a whole word
+    """
+    tokens = ([k.replace("\\", "") for k in module.bnf_terminals] +
+              list(module.bnf_simple_replacements) +
+              list(module.bnf_bracket_replacements))
+    lines = ['1<=_\n']
+    for a in tokens:
+        for b in tokens:
+            lines.append(a + b + '\n')
+            lines.append(a + b + '_ 1' + a + '\n')
+    return lines
+
+
+def bench_highlight(texdir, module, args):
+    """
+    BNF lines highlighted per second.  The highlighter must give what
+    the old one gives, byte for byte, so both are first run on every
+    BNF line of every version, and on glued terminals
+    """
+    if not hasattr(module, 'bnf_terminals'):
+        print('highlight: %s has no terminals to highlight'
+              % (os.path.relpath(texdir, root)))
+        return
+    for version_dir in sorted(glob.glob(os.path.join(root, '*', 'tex'))):
+        version = pretextlib.load_pretext(version_dir)
+        if not hasattr(version, 'bnf_terminals'):
+            continue
+        old = subn_replacements(version)
+        lines = glued_lines(version)
+        for fname in sorted(glob.glob(os.path.join(version_dir, '*.pt'))):
+            lines.extend(tagged_lines(fname, '%%bnf', '%%endbnf'))
+        for line in lines:
+            if version.bnf_replacements(line) != old(line):
+                sys.exit('highlight: %s highlights %r differently'
+                         % (os.path.relpath(version_dir, root), line))
+        print('highlight  %s: %d lines highlighted as before'
+              % (os.path.relpath(version_dir, root), len(lines)))
+    lines = tagged_lines(os.path.join(texdir, 'p4.pt'), '%%bnf', '%%endbnf')
+    old = subn_replacements(module)
+    new = module.bnf_replacements
+    compare('highlight', 'lines', len(lines), [
+        ('re.subn', lambda: [old(line) for line in lines]),
+        ('steps', lambda: [new(line) for line in lines]),
+    ], args.repeat)
+
+
+def find_tags_stripping(module, lines):
+    """
+    The tag dispatch as it was: every line stripped and looked up in
+    process_tags, and each of its keys tested on tag lines
+    """
+    process_tags = module.process_tags
+    found = []
+    for number, line in enumerate(lines):
+        key = line.strip()
+        if key.startswith(module.comment_string):
+            continue
+        if key in process_tags.keys():
+            info = process_tags[key]
+            found.append((number,
+                          "keep_line" in info.keys() and info["keep_line"],
+                          "call" in info.keys(),
+                          "add_text" in info.keys(),
+                          "line_processor" in info.keys()))
+    return found
+
+
+def find_tags_compiled(module, lines):
+    """
+    The tag dispatch as it is: only lines containing "%%" stripped, and
+    tags looked up in the compiled tag_actions
+    """
+    tag_actions = module.tag_actions
+    found = []
+    for number, line in enumerate(lines):
+        if "%%" in line:
+            key = line.strip()
+            if key.startswith(module.comment_string):
+                continue
+            actions = pretextlib.lookup_tag(tag_actions, key)
+            if actions is not None:
+                found.append((number, actions[0], actions[1] is not None,
+                              actions[2] is not None, actions[3]))
+    return found
+
+
+def bench_tags(texdir, module, args):
+    """
+    Lines per second through the tag dispatch of the main loop, which
+    is the overhead of each line before it is processed
+    """
+    lines = document_lines(texdir, args.copies)
+    compare('tags', 'lines', len(lines), [
+        ('strip', lambda: find_tags_stripping(module, lines)),
+        ('compiled', lambda: find_tags_compiled(module, lines)),
+    ], args.repeat)
+
+
+def peak_rss(command, cwd):
+    """
+    Run command, and return the most memory it used at once: its peak
+    resident set size, in bytes
+    """
+    with open(os.devnull, 'w') as devnull:
+        process = subprocess.Popen(command, cwd=cwd, stdout=devnull)
+    _, status, usage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    if process.returncode:
+        sys.exit('stream: %s failed' % (' '.join(command)))
+    return usage.ru_maxrss * 1024
+
+
+def bench_stream(texdir, module, args):
+    """
+    Peak memory of pretext.py processing a growing number of copies of
+    p4.pt, as it was before it streamed its input, taken from git, and
+    as it is.  Both run as scripts with the same Python, and must
+    write the same output for p4.pt itself; for several copies the
+    BnfScraper of v1.1.0 lists each repeated nonterminal once, where
+    the old one listed it once per copy
+    """
+    relative = os.path.relpath(os.path.join(texdir, 'pretext.py'),
+                               os.path.dirname(root))
+    old_source = subprocess.check_output(
+        ['git', 'show', '%s:%s' % (args.old_rev, relative)], cwd=root)
+    fname = os.path.join(texdir, 'p4.pt')
+    with tempfile.TemporaryDirectory() as tmp:
+        old_script = os.path.join(tmp, 'pretext.py')
+        with open(old_script, 'wb') as outfile:
+            outfile.write(old_source)
+        old_output = os.path.join(tmp, 'old.tex')
+        new_output = os.path.join(tmp, 'new.tex')
+        for count in sorted(set([1, max(1, args.copies // 4), args.copies])):
+            fnames = [fname] * count
+            old = peak_rss([args.python, old_script] + fnames +
+                           ['-o', old_output], tmp)
+            new = peak_rss([args.python, os.path.join(texdir, 'pretext.py')]
+                           + fnames + ['-o', new_output], texdir)
+            if count == 1 and not filecmp.cmp(old_output, new_output,
+                                              shallow=False):
+                sys.exit('stream: the outputs of %s differ' % (fname))
+            print('stream     %3d copies  old %8.1f MB  new %8.1f MB'
+                  % (count, old / 1e6, new / 1e6))
+
+
+def scrape_with_lists(lines):
+    """
+    The BNF scraper as it was: regexes looked up for every line, and
+    every candidate keyword appended to a list
+    """
+    p4_keywords = []
+    bnf_nonterminals = []
+    suppressed_keywords = set()
+
+    within_bnf = False
+    for line in lines:
+        key = line.strip()
+        if key.startswith("%%not_a_keyword"):
+            match = re.match(r"%%not_a_keyword\s+([0-9A-Za-z_]+)", key)
+            if match:
+                suppressed_keywords.add(match.group(1))
+        if not within_bnf:
+            if key == "%%bnf" or key == "%%bnfsummarystart":
+                within_bnf = True
+        else:
+            if key == "%%endbnf":
+                within_bnf = False
+            else:
+                match = re.match(r"([0-9A-Za-z_]+)\s*::=", key)
+                if match != None:
+                    bnf_nonterminals.append(match.group(1))
+
+                tokens = re.split(r"\s+",key)
+                for token in tokens:
+                    if len(token) <= 1:
+                        continue
+                    if token.endswith("_name"):
+                        continue
+                    if token.endswith("_text"):
+                        continue
+                    if re.match(r'[A-Za-z][0-9A-Za-z_]+$', token) == None:
+                        continue
+                    p4_keywords.append(token)
+
+    p4_keywords = set(p4_keywords) - set(bnf_nonterminals)
+    p4_keywords -= suppressed_keywords
+    p4_keywords = list(p4_keywords)
+    p4_keywords.sort()
+    return sorted(set(bnf_nonterminals)), p4_keywords
+
+
+def scrape_with_scraper(module, lines):
+    """
+    The BNF scraper as it is, the BnfScraper class
+    """
+    scraper = module.BnfScraper()
+    for line in lines:
+        scraper.scan(line)
+    return sorted(scraper.nonterminals), scraper.keywords()
+
+
+def synthetic_document(texdir, size):
+    """
+    Return size lines of BNF blocks made of the productions of
+    p4.pt, each copy defining new non-terminals, and of the text
+    between them
+    """
+    fname = os.path.join(texdir, 'p4.pt')
+    bnf = tagged_lines(fname, '%%bnf', '%%endbnf')
+    production_re = re.compile(r"^(\s*)([0-9A-Za-z_]+)(\s*::=)")
+    lines = []
+    copy = 0
+    while len(lines) < size:
+        lines.append('Text about the grammar, copy %d.\n' % (copy))
+        lines.append('%%bnf\n')
+        for line in bnf:
+            lines.append(production_re.sub(r"\1\2_%d\3" % (copy), line))
+        lines.append('%%endbnf\n')
+        copy += 1
+    return lines[:size]
+
+
+def bench_scrape(texdir, module, args):
+    """
+    Lines of a synthetic document scraped for keywords per second
+    """
+    if not hasattr(module, 'BnfScraper'):
+        print('scrape: %s has no BNF scraper; try --version v1.1.0'
+              % (os.path.relpath(texdir, root)))
+        return
+    lines = synthetic_document(texdir, args.lines)
+    compare('scrape', 'lines', len(lines), [
+        ('lists', lambda: scrape_with_lists(lines)),
+        ('scraper', lambda: scrape_with_scraper(module, lines)),
+    ], args.repeat)
+
+
+benchmarks = {
+    'highlight': bench_highlight,
+    'scrape': bench_scrape,
+    'stream': bench_stream,
+    'tags': bench_tags,
+}
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    unknown = [name for name in args.benchmarks if name not in benchmarks]
+    if unknown:
+        parser.error('no benchmark %s; there are %s'
+                     % (', '.join(unknown), ', '.join(sorted(benchmarks))))
+    texdir = os.path.join(root, args.version, 'tex')
+    module = pretextlib.load_pretext(texdir)
+    for name in args.benchmarks or sorted(benchmarks):
+        benchmarks[name](texdir, module, args)
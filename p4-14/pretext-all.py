@@ -0,0 +1,99 @@
+#! /usr/bin/env python3
+
+# SPDX-FileCopyrightText: 2026 The P4 Language Consortium
+#
+# SPDX-License-Identifier: Apache-2.0
+
+# Regenerate the .tex files of every P4_14 spec version by running
+# each version's own pretext.py on each of its .pt sources.  The jobs
+# are independent, so they run in parallel, and the whole rebuild takes
+# about as long as the slowest single job.  Each pretext.py is loaded
+# as a module, and its Pretext class does the work inside the worker
+# processes, so no job pays for starting an interpreter of its own.
+
+import argparse
+import concurrent.futures
+import os
+import sys
+import time
+
+import pretextlib
+
+parser = argparse.ArgumentParser(description="""
+Run the pretext stage for all P4_14 spec versions and documents in
+parallel, and report the wall time of each job.
+""")
+parser.add_argument('versions', metavar='version', nargs='*',
+                    help='version directories to build (default: all)')
+parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(),
+                    help='number of jobs to run at once')
+
+
+def find_jobs(root, versions):
+    """
+    Return a (tex directory, source, output) tuple for each .pt file
+    in a tex directory that has a pretext.py
+    """
+    jobs = []
+    if not versions:
+        versions = sorted(os.listdir(root))
+    for version in versions:
+        texdir = os.path.join(root, version, 'tex')
+        if not os.path.exists(os.path.join(texdir, 'pretext.py')):
+            continue
+        for fname in sorted(os.listdir(texdir)):
+            if fname.endswith('.pt'):
+                jobs.append((texdir, fname, fname[:-len('.pt')] + '.tex'))
+    return jobs
+
+
+def run_job(job):
+    """
+    Run one job, and return an error message (None if it succeeded)
+    and the time it took
+    """
+    texdir, source, output = job
+    start = time.time()
+    error = None
+    try:
+        module = pretextlib.load_pretext(texdir)
+        lines = pretextlib.read_sources([os.path.join(texdir, source)])
+        with open(os.path.join(texdir, output), 'w') as outfile:
+            outfile.writelines(module.Pretext().process(lines))
+    except SystemExit as e:
+        error = str(e)
+    except Exception as e:
+        error = '%s: %s' % (type(e).__name__, e)
+    return error, time.time() - start
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    root = os.path.dirname(os.path.abspath(__file__))
+    jobs = find_jobs(root, args.versions)
+    if not jobs:
+        sys.exit('No pretext jobs found')
+
+    # The jobs are CPU bound, so they run in a pool of processes; with
+    # a single job at a time, they simply run in this process.
+    start = time.time()
+    failed = 0
+    if args.jobs > 1:
+        pool = concurrent.futures.ProcessPoolExecutor(args.jobs)
+        results = pool.map(run_job, jobs)
+    else:
+        pool = None
+        results = map(run_job, jobs)
+    for job, (error, elapsed) in zip(jobs, results):
+        texdir, source, output = job
+        name = os.path.join(os.path.relpath(texdir, root), output)
+        status = 'ok' if error is None else 'FAILED'
+        print('%-28s %7.3f s  %s' % (name, elapsed, status))
+        if error is not None:
+            failed += 1
+            print(error)
+    if pool is not None:
+        pool.shutdown()
+    print('%-28s %7.3f s' % ('total wall time', time.time() - start))
+    if failed:
+        sys.exit(1)
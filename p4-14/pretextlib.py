@@ -0,0 +1,424 @@
+# SPDX-FileCopyrightText: 2026 The P4 Language Consortium
+#
+# SPDX-License-Identifier: Apache-2.0
+
+#
+# The parts of the pretext preprocessor that are the same for every
+# P4_14 spec version.  Each version's tex/pretext.py keeps its own
+# process_tags, BNF tables and line processors, and imports this.
+#
+
+import codecs
+import os
+import re
+import tempfile
+
+def compile_bnf_replacements(terminals, simple_replacements,
+                             bracket_replacements):
+    """
+    Return a function that rewrites a BNF line exactly as applying the
+    bracket replacements, then the simple ones, then bolding each
+    terminal as a whole word, one after another, does.  Each step sees
+    the result of the previous ones, so that a replacement can change
+    whether a terminal next to it is still a whole word, as in 1<=_;
+    the steps are kept, but a step whose text is not in the line is
+    skipped, and a line that no step matches is returned after one
+    regex search.
+    """
+    steps = []
+    for table in (bracket_replacements, simple_replacements):
+        for s, r in table.items():
+            steps.append((s, None, r))
+    for k in terminals:
+        new = "@\\textbf{" + k + "}@"
+        new = new.replace("_", "\\_")
+        # Terminals such as \& are regex escapes of the text matched
+        steps.append((k.replace("\\", ""), re.compile("\\b" + k + "\\b"),
+                      new.replace("\\", "\\\\")))
+
+    literals = set(bracket_replacements) | set(simple_replacements)
+    alternatives = [re.escape(s) for s in literals]
+    alternatives.append("\\b(?:" + "|".join(terminals) + ")\\b")
+    regex = re.compile("|".join(alternatives))
+
+    def bnf_replacements(line):
+        if not regex.search(line):
+            return line
+        for text, pattern, new in steps:
+            if text in line:
+                if pattern is None:
+                    line = line.replace(text, new)
+                else:
+                    line = pattern.sub(new, line)
+        return line
+    return bnf_replacements
+
+# P4 specific: This object accumulates all BNF text
+class BnfStore(object):
+    """
+    Accumulates the typeset BNF in a temporary file, so that it does
+    not grow the memory used with the input, and indexes the
+    productions by the section they appear in and by the non-terminal
+    they define, as ranges of offsets in the file.  A production runs
+    from its "::=" line up to the next blank line, production or end
+    of the BNF block.
+    """
+
+    production_re = re.compile(r"\s*([0-9A-Za-z_]+)\s*::=")
+
+    def __init__(self):
+        self.spill = tempfile.TemporaryFile()
+        self.size = 0
+        # Section label -> list of [start, end) ranges of offsets
+        self.sections = {}
+        # Non-terminal -> list of (section label, start, end)
+        self.productions = {}
+        self.section = None
+        self.production = None
+        self.production_start = 0
+        # When not None, calls to start_section and add are logged
+        # here so that they can be replayed from the build cache
+        self.log = None
+
+    def start_section(self, label):
+        if self.log is not None:
+            self.log.append(["section", label])
+        self.end_production()
+        self.section = label
+
+    def add(self, source, line):
+        """
+        Add line, the typeset form of the BNF source line source
+        """
+        if self.log is not None:
+            self.log.append(["add", source, line])
+        match = self.production_re.match(source)
+        if match:
+            self.end_production()
+            self.production = match.group(1)
+            self.production_start = self.size
+        elif source.strip() == "":
+            self.end_production()
+        data = line if isinstance(line, bytes) else line.encode("utf-8")
+        start = self.size
+        self.spill.write(data)
+        self.size += len(data)
+        ranges = self.sections.setdefault(self.section, [])
+        if ranges and ranges[-1][1] == start:
+            ranges[-1][1] = self.size
+        else:
+            ranges.append([start, self.size])
+
+    def end_production(self):
+        if self.production is not None:
+            self.productions.setdefault(self.production, []).append(
+                (self.section, self.production_start, self.size))
+            self.production = None
+
+    def section_of(self, nonterminal):
+        """
+        Return the labels of the sections defining nonterminal
+        """
+        return [p[0] for p in self.productions.get(nonterminal, [])]
+
+    def write(self, outfile, section=None):
+        """
+        Write all of the BNF, or only that of the given section
+        """
+        if section is None:
+            ranges = [(0, self.size)]
+        else:
+            ranges = self.sections[section]
+        for start, end in ranges:
+            self.spill.seek(start)
+            # A block may end within a character; the decoder keeps
+            # its first bytes for the next block
+            decoder = codecs.getincrementaldecoder("utf-8")()
+            while start < end:
+                data = self.spill.read(min(end - start, 1 << 16))
+                start += len(data)
+                outfile.write(data if isinstance(data, str)
+                              else decoder.decode(data))
+        self.spill.seek(0, os.SEEK_END)
+
+# The label of each \SECTION starts a new section of the BNF
+section_re = re.compile(r"\\SECTION\{.*\}\{([^{}]*)\}")
+
+def track_section(pretext, line):
+    match = section_re.match(line)
+    if match:
+        pretext.bnf_store.start_section(match.group(1))
+
+# Call at the end of a BNF block
+def end_bnf(pretext, outfile, line):
+    pretext.bnf_store.end_production()
+
+# Each process_tags entry is compiled once into a tuple of the
+# actions to take for the tag, in the order they are taken:
+#   (keep_line, call, add_text, sets_line_processor, line_processor,
+#    defer, argument)
+def compile_tag(info):
+    return (info.get("keep_line", False),
+            info.get("call"),
+            info.get("add_text"),
+            "line_processor" in info,
+            info.get("line_processor"),
+            info.get("defer", False),
+            info.get("argument", False))
+
+def compile_tags(process_tags):
+    """
+    Return the tag_actions of a process_tags dictionary: each tag
+    mapped to its tuple of actions
+    """
+    return dict((tag, compile_tag(info))
+                for tag, info in process_tags.items())
+
+def lookup_tag(tag_actions, key):
+    """
+    Return the tag_actions entry for a stripped input line, or None
+    if the line is not a tag
+    """
+    actions = tag_actions.get(key)
+    if actions is None and key.startswith("%%"):
+        actions = tag_actions.get(key.split(None, 1)[0])
+        if actions is not None and not actions[6]:
+            actions = None
+    return actions
+
+#
+# The main processor
+#
+
+def read_sources(fnames):
+    """
+    Yield the lines of each source file in turn, without holding
+    the whole input in memory
+    """
+    for fname in fnames:
+        with open(fname, "r") as infile:
+            for line in infile:
+                yield line
+
+# Output of tags marked "defer" depends on the keywords scraped from
+# the whole input, which are not known until the last line is read.
+# Each deferred tag starts a new spill file that receives the output
+# following it; at the end the deferred tags are written out, each
+# followed by a copy of its spill file.
+def open_spill():
+    """
+    Return a write-only and a read-only text file sharing one
+    anonymous temporary file
+    """
+    spill = tempfile.TemporaryFile()
+    writer = os.fdopen(os.dup(spill.fileno()), "w")
+    reader = os.fdopen(os.dup(spill.fileno()), "r")
+    spill.close()
+    return writer, reader
+
+class OutputBuffer(list):
+    """
+    A list of strings that can stand in for an output file
+    """
+    write = list.append
+    writelines = list.extend
+
+class Pretext(object):
+    """
+    The state of one run of the preprocessor.  Each instance starts
+    clean and shares nothing with the others except cache, so that
+    several documents can be processed by one program, one after
+    another or in separate threads (each with its own cache, if any).
+
+    Each version's pretext.py subclasses this with the tag_actions
+    compiled from its process_tags, and with the class of its BNF
+    scraper if it scrapes the BNF for keywords.  The build cache needs
+    a scraper.
+    """
+
+    # Number of output lines gathered before they are passed on
+    flush_lines = 256
+
+    tag_actions = {}
+    # Lines starting with this are removed from the input
+    comment_string = "%%ptcomment"
+    # Called with the within_bnf flag to make a scraper for each run
+    scraper_class = None
+
+    def __init__(self, cache=None):
+        # This is the function (pointer) that is called for each line
+        # Commands in the file may update this pointer.
+        self.line_processor = None
+        # P4 specific: This object accumulates all BNF text
+        self.bnf_store = BnfStore()
+        self.scraper = None
+        if self.scraper_class is not None:
+            self.scraper = self.scraper_class(False)
+        # Scan for these and then bold them
+        self.bnf_nonterminals = []
+        # Scan for these from the BNF, then bold them in code fragments
+        self.p4_keywords = []
+        self.cache = cache
+
+    # Call once all lines have been scraped to finalize the keyword list
+    def finish_scrape(self):
+        if self.scraper is None:
+            return
+        self.bnf_nonterminals = list(self.scraper.nonterminals)
+        self.p4_keywords = self.scraper.keywords()
+
+    def write_tag(self, outfile, actions, line):
+        keep_line, call, add_text = actions[:3]
+        if keep_line:
+            outfile.write(line)
+        if call is not None:
+            call(self, outfile, line)
+        if add_text is not None:
+            outfile.write(add_text)
+
+    # Process a line that is not a tag according to the current state
+    def process_line(self, outfile, line):
+        if self.scraper is not None:
+            self.scraper.scan(line)
+        if "%%" in line and line.strip().startswith(self.comment_string):
+            return
+        if self.line_processor is None: # Default prints out the line
+            if line.startswith("\\SECTION"):
+                track_section(self, line)
+            outfile.write(line)
+        else: # Otherwise, call the line processor
+            self.line_processor(self, outfile, line)
+
+    def record_run(self, run):
+        """
+        Process a run of lines and return a record of its effects
+        """
+        # Scrape the run on its own, so that the record holds everything
+        # found in it with line numbers relative to the run
+        document_scraper = self.scraper
+        self.scraper = self.scraper_class(document_scraper.within_bnf)
+        output = OutputBuffer()
+        self.bnf_store.log = []
+        for line in run:
+            self.process_line(output, line)
+        record = {
+            "output" : "".join(output),
+            "bnf" : self.bnf_store.log,
+            "scraped" : self.scraper.results(),
+        }
+        self.bnf_store.log = None
+        self.scraper = document_scraper
+        self.scraper.merge(record["scraped"])
+        return record
+
+    def replay_run(self, record):
+        """
+        Apply the effects of a recorded run, other than its output
+        """
+        for op in record["bnf"]:
+            if op[0] == "section":
+                self.bnf_store.start_section(op[1])
+            else:
+                self.bnf_store.add(op[1], op[2])
+        self.scraper.merge(record["scraped"])
+
+    def process(self, lines):
+        """
+        Process an iterable of input lines, and return an iterator
+        over the output lines.  Each ends with a newline, except the
+        last one if the output does not.
+        """
+        partial = ""
+        for text in self.process_text(lines):
+            text = text.split("\n")
+            text[0] = partial + text[0]
+            partial = text.pop()
+            for line in text:
+                yield line + "\n"
+        if partial:
+            yield partial
+
+    def process_text(self, lines):
+        """
+        Process an iterable of input lines, and return an iterator
+        over the output text, in pieces of any length
+        """
+        output = OutputBuffer()
+        out = output
+        deferred = []
+        run = []
+
+        # Process line by line in a single pass, scanning for BNF
+        # terminals along the way
+        for line in lines:
+            # Tags and comments all contain "%%", so most lines need no
+            # stripping or tag lookup
+            actions = None
+            if "%%" in line:
+                key = line.strip()
+                if not key.startswith(self.comment_string):
+                    actions = lookup_tag(self.tag_actions, key)
+            if actions is None:
+                if self.cache is None:
+                    self.process_line(out, line)
+                else:
+                    run.append(line)
+                if len(output) >= self.flush_lines:
+                    for text in output:
+                        yield text
+                    del output[:]
+                continue
+
+            if run:
+                self.cache.process_run(self, out, run)
+                run = []
+
+            # input line is a tag; update state
+            if self.scraper is not None:
+                self.scraper.scan(line)
+            if actions[5]:
+                out, reader = open_spill()
+                deferred.append((actions, line, out, reader))
+            else:
+                self.write_tag(out, actions, line)
+            if actions[3]:
+                self.line_processor = actions[4]
+
+        if run:
+            self.cache.process_run(self, out, run)
+
+        self.finish_scrape()
+        for actions, line, writer, reader in deferred:
+            self.write_tag(output, actions, line)
+            writer.close()
+            for text in output:
+                yield text
+            del output[:]
+            reader.seek(0)
+            for block in iter(lambda: reader.read(1 << 16), ""):
+                yield block
+            reader.close()
+        for text in output:
+            yield text
+
+# The pretext modules loaded so far, by tex directory.  The versions
+# each have their own pretext.py, so each is loaded under a name of
+# its own.
+modules = {}
+
+def load_pretext(texdir):
+    """
+    Return the pretext.py of a version, given its tex directory, as a
+    module
+    """
+    import importlib.util
+    module = modules.get(texdir)
+    if module is None:
+        version = os.path.basename(os.path.dirname(os.path.abspath(texdir)))
+        name = "pretext_" + version.replace(".", "_")
+        spec = importlib.util.spec_from_file_location(
+            name, os.path.join(texdir, "pretext.py"))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        modules[texdir] = module
+    return module
@@ -29,18 +29,14 @@
 # mode appropriately.
 #
 
+import os
 import sys
-import re
 import argparse
 
-# This is the function (pointer) that is called for each line
-# Commands in the file may update this pointer.
-global line_processor
-line_processor = None
-
-# P4 specific: This variable accumulates all BNF text
-global all_bnf
-all_bnf = ""
+# The code shared with the pretext.py of the other versions
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir, os.pardir))
+import pretextlib
 
 # Processing BNF:
 #   First, simple replacements
@@ -146,21 +142,13 @@ bnf_terminals = [
     "width",
 ]
 
-def bnf_replacements(line):
-    for s, r in bnf_bracket_replacements.iteritems():
-        line = line.replace(s, r)
-    for s, r in bnf_simple_replacements.iteritems():
-        line = line.replace(s, r)
-    for k in bnf_terminals:
-        exp = "\\b" + k + "\\b"
-        new = "@\\\\textbf{" + k + "}@"
-        new = new.replace("_", "\\_")
-        (line, _) = re.subn(exp, new, line)
-    return line
+# All of the replacements are made in a single scan of each line
+bnf_replacements = pretextlib.compile_bnf_replacements(
+    bnf_terminals, bnf_simple_replacements, bnf_bracket_replacements)
 
 # Line processor for when BNF is being processed.
-def accumulate_bnf(outfile, line):
-    global all_bnf
+def accumulate_bnf(pretext, outfile, line):
+    source = line
     # Escape _
     #line = line.replace("_", "\_")
     #line = line.replace("{", "\{")
@@ -168,20 +156,22 @@ def accumulate_bnf(outfile, line):
     # TODO: Fix terminal _
     line = bnf_replacements(line)
     outfile.write(line)
-    all_bnf += line
+    pretext.bnf_store.add(source, line)
 
 # Call to deposit the accumulated BNF to the output file
-def deposit_bnf(outfile, line):
-    outfile.write(all_bnf)
-    
+def deposit_bnf(pretext, outfile, line):
+    pretext.bnf_store.write(outfile)
+
 # These are the tags that are processed from the input; 
 # Each tag must appear alone on an input line
 #
 # Legal keys in the dictionary associated with each tag:
 #   keep_line: Copy this line to the output file before any other processing
-#   call: Call this function
+#   call: Call this function, with the Pretext instance, the output
+#         file and the line
 #   add_text: Write this to the output file
-#   line_processor: Update the line processor to this function
+#   line_processor: Update the line processor to this function, which
+#                   is called like the call function
 #
 # The keys are processed in the order shown.
 
@@ -194,6 +184,7 @@ process_tags = {
     },
     "%%endbnf" : {
         #"add_text" : "\end{Verbatim}\n%%endbnf\n",
+        "call" : pretextlib.end_bnf,
         "add_text" : "\end{lstlisting}\n%%endbnf\n",
         "line_processor" : None,
     },
@@ -219,13 +210,21 @@ process_tags = {
 global comment_string
 comment_string = "%%ptcomment"
 
+global tag_actions
+tag_actions = pretextlib.compile_tags(process_tags)
+
 #
 # The main processor
 #
 
-if __name__ == "__main__":
-    input = []
+class Pretext(pretextlib.Pretext):
+    """
+    The preprocessor, with the tags of this version
+    """
+    tag_actions = tag_actions
+    comment_string = comment_string
 
+if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='P4 tex preprocessor',
                         usage="%(prog)s source [source...] [--output dest]")
     parser.add_argument('sources', metavar='source', type=str, nargs='+',
@@ -240,30 +239,8 @@ if __name__ == "__main__":
     else:
         outfile = sys.stdout
 
-    # Gather all input into an array of lines
-    for fname in args.sources:
-        with open(fname, "r") as infile:
-            input.extend(infile.readlines())
-
-    # Process line by line
-    for line in input:
-        key = line.strip()
-        if key.startswith(comment_string):
-            continue
-        if key in process_tags.keys():
-            # input line is a tag; update state
-            info = process_tags[key]
-
-            if "keep_line" in info.keys() and info["keep_line"]:
-                outfile.write(line)
-            if "call" in info.keys():
-                info["call"](outfile, line)
-            if "add_text" in info.keys():
-                outfile.write(info["add_text"])
-            if "line_processor" in info.keys():
-                line_processor = info["line_processor"]
-        else: # Process line according to current state
-            if line_processor is None: # Default prints out the line
-                outfile.write(line)
-            else: # Otherwise, call the line processor
-                line_processor(outfile, line)
+    lines = pretextlib.read_sources(args.sources)
+    # One line at a time: the writelines of Python 2 files holds
+    # on to the pieces it has written
+    for line in Pretext().process(lines):
+        outfile.write(line)
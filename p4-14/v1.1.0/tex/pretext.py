@@ -29,18 +29,20 @@
 # mode appropriately.
 #
 
+import os
 import sys
 import re
 import argparse
 
-# This is the function (pointer) that is called for each line
-# Commands in the file may update this pointer.
-global line_processor
-line_processor = None
-
-# P4 specific: This variable accumulates all BNF text
-global all_bnf
-all_bnf = ""
+# The code shared with the pretext.py of the other versions
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir, os.pardir))
+import pretextlib
+import collections
+import hashlib
+import json
+import shutil
+import time
 
 # Processing BNF:
 #   First, simple replacements
@@ -55,18 +57,12 @@ def wrap_in_command(line, start, length, command="textbf"):
     result += line[start+length:]
     return result
 
-# Scan for these and then bold them
-bnf_nonterminals = []
-
-# Scan for these from the BNF, then bold them in code fragments
-p4_keywords = []
-
 def bnf_replacements(line):
     return line
 
 # Line processor for when BNF is being processed.
-def accumulate_bnf(outfile, line):
-    global all_bnf
+def accumulate_bnf(pretext, outfile, line):
+    source = line
     # Escape _
     #line = line.replace("_", "\_")
     #line = line.replace("{", "\{")
@@ -74,27 +70,36 @@ def accumulate_bnf(outfile, line):
     # TODO: Fix terminal _
     line = bnf_replacements(line)
     outfile.write(line)
-    all_bnf += line
+    pretext.bnf_store.add(source, line)
 
 # Line processor for when P4 code is being processed.
-def process_code(outfile, line):
+def process_code(pretext, outfile, line):
     outfile.write(line)
 
 # Call to deposit the accumulated BNF to the output file
-def deposit_bnf(outfile, line):
-    outfile.write(all_bnf)
+def deposit_bnf(pretext, outfile, line):
+    pretext.bnf_store.write(outfile)
+
+# Call to deposit the BNF accumulated so far in the section whose
+# label follows the tag
+def deposit_section_bnf(pretext, outfile, line):
+    words = line.split(None, 1)
+    if len(words) != 2 or words[1].strip() not in pretext.bnf_store.sections:
+        sys.exit("pretext: no BNF for section in: %s" % line.strip())
+    label = words[1].strip()
+    pretext.bnf_store.write(outfile, label)
 
 # Call to deposit the accumulated P4 keywords
-def deposit_keywords(outfile, line):
+def deposit_keywords(pretext, outfile, line):
     outfile.write("\\begin{Verbatim}[commandchars=\\\\\\{\\}]\n")
-    for keyword in p4_keywords:
+    for keyword in pretext.p4_keywords:
         outfile.write(keyword+"\n")
     outfile.write("\\end{Verbatim}\n")
 
 # Set up appropriate keywords to be bolded in the BNF and P4 listing
 # environments, respectively
 
-def set_bnf_lstlisting_keywords(outfile, line):
+def set_bnf_lstlisting_keywords(pretext, outfile, line):
     outfile.write("""
 \\lstdefinestyle{BNFstyle}{
     language=BNF,%%
@@ -102,9 +107,9 @@ def set_bnf_lstlisting_keywords(outfile, line):
     backgroundcolor=\\color{bnfgreen},%%
     morekeywords={%s}%%
 }
-""" % ", ".join(bnf_nonterminals))
+""" % ", ".join(pretext.bnf_nonterminals))
 
-def set_p4_lstlisting_keywords(outfile, line):
+def set_p4_lstlisting_keywords(pretext, outfile, line):
     outfile.write("""
 \\lstdefinestyle{P4style}{
     language=C,%%
@@ -123,7 +128,7 @@ def set_p4_lstlisting_keywords(outfile, line):
     numbersep=1.5mm,%%
     numberstyle=\\tiny,%%
 }
-""" % ", ".join(p4_keywords))
+""" % ", ".join(pretext.p4_keywords))
 
 
 
@@ -132,9 +137,15 @@ def set_p4_lstlisting_keywords(outfile, line):
 #
 # Legal keys in the dictionary associated with each tag:
 #   keep_line: Copy this line to the output file before any other processing
-#   call: Call this function
+#   call: Call this function, with the Pretext instance, the output
+#         file and the line
 #   add_text: Write this to the output file
-#   line_processor: Update the line processor to this function
+#   line_processor: Update the line processor to this function, which
+#                   is called like the call function
+#   argument: The tag may be followed by an argument on the same line,
+#             which the call function can read from the line
+#   defer: Hold back the output of this tag until the whole input has
+#          been scraped for BNF non-terminals and P4 keywords
 #
 # The keys are processed in the order shown.
 
@@ -147,6 +158,7 @@ process_tags = {
     },
     "%%endbnf" : {
         #"add_text" : "\end{Verbatim}\n%%endbnf\n",
+        "call" : pretextlib.end_bnf,
         "add_text" : "\end{lstlisting}\n%%endbnf\n",
         "line_processor" : None,
     },
@@ -166,113 +178,320 @@ process_tags = {
         "call" : deposit_bnf,
         "line_processor" : None,
     },
+    "%%bnfsectionsummary" : {
+        "argument" : True,
+        "call" : deposit_section_bnf,
+        "line_processor" : None,
+    },
     "%%listkeywords" : {
+        "defer" : True,
         "call" : deposit_keywords,
         "line_processor" : None,
     },
     "%%set_bnf_lstlisting_keywords" : {
+        "defer" : True,
         "call" : set_bnf_lstlisting_keywords,
         "line_processor" : None,
     },
     "%%set_p4_lstlisting_keywords" : {
+        "defer" : True,
         "call" : set_p4_lstlisting_keywords,
         "line_processor" : None,
     }
 }
 
-def scrape_bnf_nonterminals(input):
-    global p4_keywords
-    global bnf_nonterminals
-
-    suppressed_keywords = set()
+class BnfScraper(object):
+    """
+    Scans the BNF blocks of the input for non-terminals (names defined
+    with ::=) and for the other words of the productions, which are
+    taken to be P4 keywords.  Lines are fed one at a time to scan().
+    The line number where each name was first seen is recorded.
+    """
 
-    within_bnf = False
-    for line in input:
+    not_a_keyword_re = re.compile(r"%%not_a_keyword\s+([0-9A-Za-z_]+)")
+    nonterminal_re = re.compile(r"([0-9A-Za-z_]+)\s*::=")
+    # Words of two characters or more, other than those ending in
+    # _name or _text, which stand for identifiers and text
+    keyword_re = re.compile(r"(?!\w*_(?:name|text)$)[A-Za-z][0-9A-Za-z_]+$")
+
+    def __init__(self, within_bnf=False):
+        self.within_bnf = within_bnf
+        self.line_number = 0
+        # Name -> line number of first occurrence
+        self.nonterminals = collections.OrderedDict()
+        self.words = {}
+        self.suppressed = {}
+        # Tokens already looked at, keywords or not
+        self.seen = set()
+        # BNF lines already scraped.  Scraping a line again finds
+        # nothing new, and BNF repeats a lot: the summary repeats every
+        # production, and productions share most of their lines.
+        self.scraped = set()
+
+    def scan(self, line):
+        self.line_number += 1
+        # Outside BNF only the tags matter, and they all contain "%%"
+        if "%%" not in line:
+            if self.within_bnf and line not in self.scraped:
+                self.scraped.add(line)
+                self.scrape(line.strip())
+            return
         key = line.strip()
         if key.startswith("%%not_a_keyword"):
-            match = re.match(r"%%not_a_keyword\s+([0-9A-Za-z_]+)", key)
+            match = self.not_a_keyword_re.match(key)
             if match:
-                suppressed_keywords.add(match.group(1))
-        if not within_bnf:
+                self.suppressed.setdefault(match.group(1), self.line_number)
+        if not self.within_bnf:
             if key == "%%bnf" or key == "%%bnfsummarystart":
-                within_bnf = True
+                self.within_bnf = True
+        elif key == "%%endbnf":
+            self.within_bnf = False
         else:
-            if key == "%%endbnf":
-                within_bnf = False
-            else:
-                match = re.match(r"([0-9A-Za-z_]+)\s*::=", key)
-                if match != None:
-                    bnf_nonterminals.append(match.group(1))
-                
-                tokens = re.split(r"\s+",key)
-                for token in tokens:
-                    if len(token) <= 1:
-                        continue
-                    if token.endswith("_name"):
-                        continue
-                    if token.endswith("_text"):
-                        continue
-                    if re.match(r'[A-Za-z][0-9A-Za-z_]+$', token) == None:
-                        continue
-                    p4_keywords.append(token)
-
-    p4_keywords = set(p4_keywords) - set(bnf_nonterminals)
-    p4_keywords -= suppressed_keywords
-    p4_keywords = list(p4_keywords)
-    p4_keywords.sort()
+            self.scrape(key)
+
+    def scrape(self, key):
+        """
+        Record the names of a line of BNF, stripped, not seen before
+        """
+        if "::=" in key:
+            match = self.nonterminal_re.match(key)
+            if match:
+                self.nonterminals.setdefault(match.group(1), self.line_number)
+        seen = self.seen
+        for token in key.split():
+            if token not in seen:
+                seen.add(token)
+                if self.keyword_re.match(token):
+                    self.words.setdefault(token, self.line_number)
+
+    def keywords(self):
+        """
+        Return the sorted list of P4 keywords
+        """
+        keywords = set(self.words) - set(self.nonterminals)
+        keywords -= set(self.suppressed)
+        return sorted(keywords)
+
+    def results(self):
+        """
+        Return what has been scraped, with line numbers, as lists
+        """
+        return {
+            "lines" : self.line_number,
+            "nonterminals" : list(self.nonterminals.items()),
+            "words" : sorted(self.words.items(), key=lambda w: w[1]),
+            "suppressed" : sorted(self.suppressed.items(), key=lambda w: w[1]),
+        }
+
+    def merge(self, results):
+        """
+        Add results from another scraper, which scanned the lines
+        following those scanned here
+        """
+        for kind in ("nonterminals", "words", "suppressed"):
+            names = getattr(self, kind)
+            for name, line_number in results[kind]:
+                names.setdefault(name, self.line_number + line_number)
+        self.line_number += results["lines"]
 
 # Lines starting with this are removed from the input
 global comment_string
 comment_string = "%%ptcomment"
 
+global tag_actions
+tag_actions = pretextlib.compile_tags(process_tags)
+
+#
+# Build cache
+#
+# With --cache, the lines between two tags are processed as a run.
+# The result of each run (its output, and what it added to the BNF
+# and to the scraped keywords) is kept in the cache, keyed on a hash
+# of the run, the state it starts in and the source of this script
+# and of pretextlib.py, so that a change to either of them or to
+# process_tags invalidates it.  Tag
+# lines are always processed, since what they write may depend on the
+# whole document.  The complete output is kept as well, keyed on all
+# of the input, so that rebuilding from unchanged sources only copies
+# it.
+#
+
+class BuildCache(object):
+    """
+    With directory None, the cache is only kept in memory
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        digest = hashlib.sha1()
+        for module in (__file__, pretextlib.__file__):
+            # The library may have been loaded from its compiled form
+            source = os.path.splitext(os.path.abspath(module))[0] + ".py"
+            with open(source, "rb") as script:
+                digest.update(script.read())
+        self.engine = digest.hexdigest()
+        self.runs = {}
+        if directory is not None:
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+            self.runs_file = os.path.join(directory, "runs.json")
+            try:
+                with open(self.runs_file, "r") as infile:
+                    self.runs = json.load(infile)
+            except (IOError, ValueError):
+                pass
+        # Runs looked up or added in this build; only these are saved
+        self.used = {}
+
+    def hash(self):
+        return hashlib.sha1(self.engine.encode("utf-8"))
+
+    def document_key(self, fnames):
+        digest = self.hash()
+        for fname in fnames:
+            with open(fname, "rb") as infile:
+                for block in iter(lambda: infile.read(1 << 16), b""):
+                    digest.update(block)
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def document_file(self, key):
+        if self.directory is None:
+            return None
+        return os.path.join(self.directory, key + ".tex")
+
+    def run_key(self, pretext, run):
+        digest = self.hash()
+        if pretext.line_processor is not None:
+            digest.update(pretext.line_processor.__name__.encode("utf-8"))
+        digest.update(b"\0bnf\0" if pretext.scraper.within_bnf else b"\0\0")
+        for line in run:
+            digest.update(line.encode("utf-8"))
+        return digest.hexdigest()
+
+    def process_run(self, pretext, outfile, run):
+        key = self.run_key(pretext, run)
+        record = self.runs.get(key)
+        if record is None:
+            record = pretext.record_run(run)
+        else:
+            pretext.replay_run(record)
+        self.used[key] = record
+        outfile.write(record["output"])
+
+    def save(self, document_key, output):
+        """
+        Save the runs used by this build and the output file for
+        document_key, dropping anything older
+        """
+        self.runs = self.used
+        self.used = {}
+        if self.directory is None:
+            return
+        for fname in os.listdir(self.directory):
+            if fname.endswith(".tex"):
+                os.remove(os.path.join(self.directory, fname))
+        if output is not None:
+            shutil.copyfile(output, self.document_file(document_key))
+        with open(self.runs_file + ".tmp", "w") as outfile:
+            json.dump(self.runs, outfile)
+        os.rename(self.runs_file + ".tmp", self.runs_file)
+
 #
 # The main processor
 #
 
-if __name__ == "__main__":
-    input = []
+class Pretext(pretextlib.Pretext):
+    """
+    The preprocessor, with the tags of this version
+    """
+    tag_actions = tag_actions
+    comment_string = comment_string
+    scraper_class = BnfScraper
+
+def build(sources, output, cache=None):
+    """
+    Process sources into the file output, or to stdout if output is
+    None, using and updating cache if given
+    """
+    document_file = None
+    if cache is not None:
+        document_key = cache.document_key(sources)
+        document_file = cache.document_file(document_key)
+
+    # Output to file or stdout based on argument output
+    if output:
+        outfile = open(output, "w")
+    else:
+        outfile = sys.stdout
 
+    if document_file is not None and os.path.exists(document_file):
+        with open(document_file, "r") as infile:
+            shutil.copyfileobj(infile, outfile)
+    else:
+        lines = pretextlib.read_sources(sources)
+        # One line at a time: the writelines of Python 2 files holds
+        # on to the pieces it has written
+        for line in Pretext(cache).process(lines):
+            outfile.write(line)
+        if cache is not None:
+            outfile.flush()
+            cache.save(document_key, output)
+
+    if output:
+        outfile.close()
+
+# Poll the sources, and rebuild whenever one of them changes.  The
+# engine stays loaded, and unchanged runs of lines are replayed from
+# the cache instead of being processed and scraped again.  Changes to
+# pretext.py itself are not picked up.
+def watch(sources, output, cache, interval=0.05):
+    stamps = None
+    while True:
+        try:
+            current = [(os.stat(f).st_mtime, os.stat(f).st_size)
+                       for f in sources]
+        except OSError: # A source is being replaced; try again
+            current = stamps
+        if current != stamps:
+            stamps = current
+            start = time.time()
+            try:
+                build(sources, output, cache)
+                sys.stderr.write("pretext: wrote %s in %.0f ms\n" %
+                                 (output, (time.time() - start) * 1000))
+            except SystemExit as e:
+                sys.stderr.write("%s\n" % e)
+        time.sleep(interval)
+
+if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='P4 tex preprocessor',
                         usage="%(prog)s source [source...] [--output dest]")
     parser.add_argument('sources', metavar='source', type=str, nargs='+',
                        help='a source file to include in the processing')
     parser.add_argument('-o', '--output', action='store', type=str,
                         help="The output file to generate")
+    parser.add_argument('--cache', action='store', type=str,
+                        help="A directory in which to keep a build cache")
+    parser.add_argument('--watch', action='store_true',
+                        help="Keep running, and regenerate the output "
+                        "whenever a source changes")
     args = parser.parse_args()
 
-    # Output to file or stdout based on argument output
-    if args.output:
-        outfile = open(args.output, "w")
+    cache = None
+    if args.cache:
+        # Each output file has a cache of its own
+        name = os.path.basename(args.output) if args.output else "stdout"
+        cache = BuildCache(os.path.join(args.cache, name))
+
+    if args.watch:
+        if not args.output:
+            parser.error("--watch needs --output")
+        if cache is None:
+            cache = BuildCache(None)
+        try:
+            watch(args.sources, args.output, cache)
+        except KeyboardInterrupt:
+            pass
     else:
-        outfile = sys.stdout
-
-    # Gather all input into an array of lines
-    for fname in args.sources:
-        with open(fname, "r") as infile:
-            input.extend(infile.readlines())
-
-    # Scan for BNF terminals
-    scrape_bnf_nonterminals(input)
-
-    # Process line by line
-    for line in input:
-        key = line.strip()
-        if key.startswith(comment_string):
-            continue
-        if key in process_tags.keys():
-            # input line is a tag; update state
-            info = process_tags[key]
-
-            if "keep_line" in info.keys() and info["keep_line"]:
-                outfile.write(line)
-            if "call" in info.keys():
-                info["call"](outfile, line)
-            if "add_text" in info.keys():
-                outfile.write(info["add_text"])
-            if "line_processor" in info.keys():
-                line_processor = info["line_processor"]
-        else: # Process line according to current state
-            if line_processor is None: # Default prints out the line
-                outfile.write(line)
-            else: # Otherwise, call the line processor
-                line_processor(outfile, line)
+        build(args.sources, args.output, cache)
@@ -0,0 +1,265 @@
+#! /usr/bin/env python3
+
+# SPDX-FileCopyrightText: 2026 The P4 Language Consortium
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import argparse
+import concurrent.futures
+import fnmatch
+import hashlib
+import json
+import os
+import re
+import shlex
+import shutil
+import subprocess
+import sys
+import time
+
+here = os.path.dirname(os.path.abspath(__file__))
+
+parser = argparse.ArgumentParser(description="""
+Compile the P4 example programs of the PSA specification, and those in
+p4-16/discussions, with p4test, several at a time, and report which
+ones fail.  Directories are searched for .p4 files that instantiate a
+main package; by default, examples (with examples/historical) and
+../discussions are.  Results are cached, keyed on a hash of the
+example, of the files it includes from this repository, such as
+psa.p4, and of the compiler, so that only the examples whose inputs
+changed are compiled again.
+""")
+parser.add_argument('paths', metavar='path', nargs='*',
+                    default=[os.path.join(here, 'examples'),
+                             os.path.join(here, '..', 'discussions')])
+parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                    help='the number of compilers to run at the same time '
+                    '(default: %(default)s)')
+parser.add_argument('--p4c', default=os.environ.get('P4C', 'p4test'),
+                    help='the compiler command, which is given -I options '
+                    'and the example (default: $P4C, or %(default)s)')
+parser.add_argument('-I', dest='include_dirs', metavar='DIR',
+                    action='append', default=[here],
+                    help='also search DIR for included files; this '
+                    'directory, with psa.p4, is searched first')
+parser.add_argument('--cache', default=os.path.join(here, 'build',
+                                                    'example-checks.json'),
+                    help='the file results are cached in '
+                    '(default: %(default)s)')
+parser.add_argument('--no-cache', action='store_true',
+                    help='compile every example, ignoring cached results')
+parser.add_argument('-v', '--verbose', action='store_true',
+                    help='print the compiler output of the examples that '
+                    'fail')
+
+# Examples that are not expected to compile with the current p4test:
+# their failures are reported, but do not make the check fail.
+#
+# psa-example-mirror-on-drop.p4 needs updates for the latest psa.p4.
+# psa-example-register1.p4 returns a struct from a register read, which
+# p4test rejects.  The historical examples and discussions are earlier
+# designs, kept for reference.
+known_failures = [
+    '*/psa-example-mirror-on-drop.p4',
+    '*/psa-example-register1.p4',
+    '*/historical/*.p4',
+    '*/discussions/*.p4',
+]
+
+# The number of results kept for inputs an example no longer has, so
+# that undoing a change does not mean compiling it again
+cache_history = 4
+
+main_re = re.compile(rb"\)\s*main\s*;")
+include_re = re.compile(rb'^\s*#\s*include\s*([<"])([^>"]*)[>"]', re.MULTILINE)
+
+
+def find_examples(paths):
+    """
+    Return the P4 files among paths, and in the directories among
+    them, that instantiate a main package, rather than only declaring
+    things for other files to include
+    """
+    fnames = []
+    for path in paths:
+        if os.path.isdir(path):
+            candidates = []
+            for dirpath, dirnames, filenames in os.walk(path):
+                dirnames.sort()
+                candidates.extend(os.path.join(dirpath, f)
+                                  for f in sorted(filenames)
+                                  if f.endswith('.p4'))
+        else:
+            candidates = [path]
+        for fname in candidates:
+            with open(fname, 'rb') as infile:
+                if main_re.search(infile.read()):
+                    fnames.append(os.path.abspath(fname))
+    return fnames
+
+
+def resolve_include(kind, name, directory, include_dirs):
+    dirs = ([directory] if kind == b'"' else []) + include_dirs
+    for d in dirs:
+        path = os.path.normpath(os.path.join(d, name))
+        if os.path.isfile(path):
+            return path
+    # Not part of this repository, e.g. core.p4; the compiler provides
+    # it, and the compiler is part of the key
+    return None
+
+
+def input_digest(fname, include_dirs, compiler):
+    """
+    Return a hash of the example fname, of the files it includes,
+    directly or not, that can be found, and of the compiler
+    """
+    digest = hashlib.sha256(compiler.encode('utf-8'))
+    seen = set()
+    pending = [fname]
+    while pending:
+        path = pending.pop()
+        if path in seen:
+            continue
+        seen.add(path)
+        with open(path, 'rb') as infile:
+            data = infile.read()
+        digest.update(b'\0%s\0%d\0' % (path.encode('utf-8'), len(data)))
+        digest.update(data)
+        for kind, name in include_re.findall(data):
+            included = resolve_include(kind, name.decode('utf-8'),
+                                       os.path.dirname(path), include_dirs)
+            if included is not None:
+                pending.append(included)
+    return digest.hexdigest()
+
+
+def compiler_identity(command):
+    """
+    Return a string that changes when the compiler command, or the
+    compiler it runs, does
+    """
+    words = shlex.split(command)
+    executable = shutil.which(words[0]) if words else None
+    if executable is None:
+        return command
+    stat = os.stat(executable)
+    return '%s\0%s\0%d\0%d' % (command, executable, stat.st_mtime_ns,
+                                stat.st_size)
+
+
+def check(command, include_dirs, fname):
+    """
+    Compile fname, and return whether it succeeded, and the output
+    """
+    args = shlex.split(command)
+    for d in include_dirs:
+        args += ['-I', d]
+    args.append(fname)
+    try:
+        process = subprocess.run(args, stdout=subprocess.PIPE,
+                                 stderr=subprocess.STDOUT)
+    except OSError as e:
+        return False, '%s: %s\n' % (args[0], e.strerror)
+    return (process.returncode == 0,
+            process.stdout.decode('utf-8', 'replace'))
+
+
+def load_cache(fname):
+    try:
+        with open(fname) as infile:
+            return json.load(infile)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(fname, cache):
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(fname)), exist_ok=True)
+        with open(fname + '.tmp', 'w') as outfile:
+            json.dump(cache, outfile, indent=1, sort_keys=True)
+        os.replace(fname + '.tmp', fname)
+    except OSError as e:
+        print("%s: cannot write %s: %s" % (parser.prog, fname, e.strerror),
+              file=sys.stderr)
+
+
+def prune_cache(cache, current):
+    """
+    Return the results of cache for the current inputs, and the
+    cache_history most recent others of each example that still exists
+    """
+    kept = dict((k, v) for k, v in cache.items() if k in current)
+    others = {}
+    for key, result in cache.items():
+        if key not in current and os.path.exists(result['example']):
+            others.setdefault(result['example'], []).append((key, result))
+    for results in others.values():
+        results.sort(key=lambda r: r[1]['time'], reverse=True)
+        kept.update(results[:cache_history])
+    return kept
+
+
+def is_known_failure(fname):
+    path = os.path.abspath(fname)
+    return any(fnmatch.fnmatch(path, pattern) for pattern in known_failures)
+
+
+def main():
+    args = parser.parse_args()
+    include_dirs = [os.path.abspath(d) for d in args.include_dirs]
+    try:
+        examples = find_examples(args.paths)
+        compiler = compiler_identity(args.p4c)
+        digests = dict((f, input_digest(f, include_dirs, compiler))
+                       for f in examples)
+    except OSError as e:
+        sys.exit("%s: %s" % (e.filename, e.strerror))
+
+    cache = {} if args.no_cache else load_cache(args.cache)
+    results = {}
+    todo = []
+    for fname in examples:
+        cached = cache.get(digests[fname])
+        if cached is not None:
+            results[fname] = (cached['ok'], cached['output'], True)
+        else:
+            todo.append(fname)
+
+    if args.jobs > 1 and len(todo) > 1:
+        with concurrent.futures.ProcessPoolExecutor(args.jobs) as executor:
+            checked = executor.map(check, [args.p4c] * len(todo),
+                                   [include_dirs] * len(todo), todo)
+            checked = list(checked)
+    else:
+        checked = [check(args.p4c, include_dirs, f) for f in todo]
+    for fname, (ok, output) in zip(todo, checked):
+        results[fname] = (ok, output, False)
+        cache[digests[fname]] = {'example': os.path.abspath(fname),
+                                 'ok': ok, 'output': output,
+                                 'time': time.time()}
+    if todo:
+        save_cache(args.cache, prune_cache(cache, set(digests.values())))
+
+    failed = 0
+    for fname in examples:
+        ok, output, cached = results[fname]
+        if ok:
+            status = 'PASS'
+        elif is_known_failure(fname):
+            status = 'FAIL (known)'
+        else:
+            status = 'FAIL'
+            failed += 1
+        print("%-12s %s%s" % (status, os.path.relpath(fname),
+                              ' (cached)' if cached else ''))
+        if not ok and args.verbose:
+            sys.stdout.write(output)
+    print("%d examples, %d compiled, %d unexpected failures"
+          % (len(examples), len(todo), failed))
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+#! /usr/bin/env python3
+
+# SPDX-FileCopyrightText: 2026 The P4 Language Consortium
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import argparse
+import json
+import sys
+
+import p4grammar
+import p4lalr
+
+parser = argparse.ArgumentParser(description="""
+Build the LALR(1) parse tables of a grammar file, a grammar.adoc file,
+the output of trim-p4-grammar-file.py or a Bison file like p4c's
+p4parser.ypp, and report their conflicts, after resolving those the
+precedence declarations resolve, as Bison does.  The tables are cached,
+keyed on a hash of the rules and of the precedence declarations, in
+build/grammar-cache next to the grammar file.  Exits with status 1 if
+the numbers of shift/reduce and reduce/reduce conflicts are not the
+expected ones.
+""")
+parser.add_argument('grammar', help='grammar file, e.g. grammar.adoc')
+parser.add_argument('--precedence-from', metavar='FILE',
+                    help='read the precedence declarations from FILE, '
+                    'e.g. for the output of trim-p4-grammar-file.py, '
+                    'which has none')
+parser.add_argument('--expect', type=int, metavar='N',
+                    help='the expected number of shift/reduce conflicts; '
+                    'without it, any conflict is an error')
+parser.add_argument('--expect-rr', type=int, default=0, metavar='N',
+                    help='the expected number of reduce/reduce conflicts '
+                    '(default: %(default)s)')
+parser.add_argument('--sets', action='store_true',
+                    help='also print the nullable non-terminals, and the '
+                    'FIRST and FOLLOW set of each non-terminal')
+parser.add_argument('--json', action='store_true',
+                    help='print the sets, tables and conflicts as JSON')
+parser.add_argument('--no-cache', action='store_true',
+                    help='build the tables even if they are cached')
+
+
+def print_sets(analysis):
+    print("Nullable: %s" % (' '.join(analysis['nullable'])))
+    for name in analysis['nonterminals'][1:]:
+        print("%s" % (name))
+        print("    FIRST:  %s" % (' '.join(analysis['first'][name])))
+        print("    FOLLOW: %s" % (' '.join(analysis['follow'][name])))
+
+
+def print_conflicts(analysis):
+    for conflict in analysis['conflicts']:
+        print("state %d: %s conflict on %s"
+              % (conflict['state'], conflict['kind'], conflict['token']))
+        for item in conflict['items']:
+            print("    shift:  %s" % (item))
+        for production in conflict['productions']:
+            print("    reduce: %s ." % (production))
+
+
+def main():
+    args = parser.parse_args()
+    try:
+        rules = p4grammar.read_rules(args.grammar)
+        precedence = p4grammar.read_precedence(args.precedence_from or
+                                               args.grammar)
+        analysis = p4lalr.load_analysis(args.grammar, rules, precedence,
+                                        use_cache=not args.no_cache)
+    except p4grammar.GrammarError as e:
+        sys.exit("%s: %s" % (args.grammar, e))
+    except OSError as e:
+        sys.exit(str(e))
+
+    conflicts = analysis['conflicts']
+    sr = sum(1 for c in conflicts if c['kind'] == 'shift/reduce')
+    rr = len(conflicts) - sr
+    if args.json:
+        json.dump(analysis, sys.stdout, indent=1)
+        print()
+    else:
+        if args.sets:
+            print_sets(analysis)
+        print_conflicts(analysis)
+        print("%d states, %d shift/reduce, %d reduce/reduce conflicts"
+              % (len(analysis['action']), sr, rr))
+    if sr != (args.expect or 0) or rr != args.expect_rr:
+        if not args.json:
+            print("expected %d shift/reduce, %d reduce/reduce conflicts"
+                  % (args.expect or 0, args.expect_rr))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+#! /usr/bin/env python3
+
+# SPDX-FileCopyrightText: 2026 The P4 Language Consortium
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+import p4grammar
+
+spec_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+tools_dir = os.path.join(spec_dir, os.pardir, os.pardir, 'tools')
+sys.path.insert(0, tools_dir)
+import adoctags
+
+parser = argparse.ArgumentParser(description="""
+Check that the tools reading the tagged regions of a grammar file agree
+on them: the tag files that trim-asciidoc-tag-comments.py --split-tags
+writes, the regions tools/adoctags.py finds, and the tag regions of the
+grammar model of p4grammar.py.  The check is made on the grammar file,
+and on a copy of it in which its first two tags each mark a second
+region, nested, at the end: a tag may mark several regions, which are
+read one after another, as asciidoctor includes them.  Exits with
+status 1 if the tools disagree.
+""")
+parser.add_argument('grammar', help='grammar file, e.g. grammar.adoc')
+
+trimmer = os.path.join(spec_dir, 'trim-asciidoc-tag-comments.py')
+
+
+def repeat_tags(text, tags):
+    """Return text with a second region of each of tags, one within
+    the other, holding one rule, at the end."""
+    lines = ['// tag::%s[]' % (tag) for tag in tags]
+    lines += ['tagRegionCheck', '    : /* empty */', '    ;']
+    lines += ['// end::%s[]' % (tag) for tag in reversed(tags)]
+    return text.rstrip('\n') + '\n\n' + '\n'.join(lines) + '\n'
+
+
+def check(fname, tmp):
+    """Return the disagreements of the tools on the tagged regions of
+    fname, and the number of tags."""
+    problems = []
+    tag_dir = os.path.join(tmp, os.path.basename(fname) + '.tags')
+    subprocess.check_call([sys.executable, trimmer, '--split-tags', tag_dir,
+                           '-o', os.devnull, fname])
+    index = adoctags.TagIndex.scan(fname)
+    with open(fname) as infile:
+        grammar = p4grammar.parse_grammar(infile.read())
+    split = set(f[:-len('.adoc')] for f in os.listdir(tag_dir))
+    if split != set(index.regions) or split != set(grammar.tags):
+        problems.append("the tags differ: %s in the tag files, %s in "
+                        "adoctags, %s in the grammar model"
+                        % (len(split), len(index.regions), len(grammar.tags)))
+    for tag, regions in index.regions.items():
+        if tag not in split or tag not in grammar.tags:
+            continue
+        with open(os.path.join(tag_dir, tag + '.adoc')) as infile:
+            if infile.read() != ''.join(l for _, l in index.read_lines(tag)):
+                problems.append("tag %s: the tag file differs from the "
+                                "regions of adoctags" % (tag))
+        spans = [[r.line, r.end_line] for r in regions]
+        model = grammar.tags[tag]
+        if model.regions != spans:
+            problems.append("tag %s: the grammar model has the regions %s, "
+                            "adoctags %s" % (tag, model.regions, spans))
+        rules = []
+        for rule in grammar.rules.values():
+            for first, last in rule.definitions:
+                if (any(start < first and last < end for start, end in spans)
+                        and rule.name not in rules):
+                    rules.append(rule.name)
+        if sorted(model.rules) != sorted(rules):
+            problems.append("tag %s: the grammar model has the rules %s, "
+                            "the regions of adoctags %s"
+                            % (tag, ' '.join(model.rules), ' '.join(rules)))
+    return problems, len(index.regions)
+
+
+def main():
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        problems, count = check(args.grammar, tmp)
+        with open(args.grammar) as infile:
+            text = infile.read()
+        tags = list(adoctags.TagIndex.scan(args.grammar).regions)[:2]
+        repeated = os.path.join(tmp, 'repeated-' +
+                                os.path.basename(args.grammar))
+        with open(repeated, 'w') as outfile:
+            outfile.write(repeat_tags(text, tags))
+        more, _ = check(repeated, tmp)
+        problems += ["with %s repeated: %s" % (' and '.join(tags), p)
+                     for p in more]
+    for problem in problems:
+        print("%s: %s" % (args.grammar, problem))
+    if problems:
+        sys.exit(1)
+    print("%s: the tools agree on %d tags, and on repeated tags"
+          % (args.grammar, count))
+
+
+if __name__ == '__main__':
+    main()
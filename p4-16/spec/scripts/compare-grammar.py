@@ -0,0 +1,75 @@
+#! /usr/bin/env python3
+
+# SPDX-FileCopyrightText: 2026 The P4 Language Consortium
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import argparse
+import json
+import sys
+
+import p4grammar
+
+parser = argparse.ArgumentParser(description="""
+Compare the grammar rules of a grammar.adoc file from the P4_16
+language specification against those of a Bison grammar file like
+p4c's p4parser.ypp (or any two such files), after trimming both as
+trim-p4-grammar-file.py does.  The order of the rules and of their
+alternatives, and white space, are ignored.  Reports the rules missing
+from the second file, the extra rules in it, and the rules whose
+alternatives differ, and exits with status 1 if there are any.
+""")
+parser.add_argument('grammar', help='grammar file to compare against, '
+                    'e.g. grammar.adoc')
+parser.add_argument('other', help='grammar file to compare, '
+                    'e.g. p4parser.ypp')
+parser.add_argument('--json', action='store_true',
+                    help='print the differences as JSON')
+
+
+def read_rules(filename):
+    try:
+        return p4grammar.read_rules(filename)
+    except p4grammar.GrammarError as e:
+        sys.exit("%s: %s" % (filename, e))
+    except OSError as e:
+        sys.exit(str(e))
+
+
+def print_diff(diff, grammar, other):
+    if diff['missing']:
+        print("Rules missing from %s:" % (other))
+        for name in diff['missing']:
+            print("    %s" % (name))
+    if diff['extra']:
+        print("Rules only in %s:" % (other))
+        for name in diff['extra']:
+            print("    %s" % (name))
+    if diff['changed']:
+        print("Rules with different alternatives"
+              " (- only in %s, + only in %s):" % (grammar, other))
+        for name, alts in diff['changed'].items():
+            print("    %s" % (name))
+            for a in alts['missing']:
+                print("        - %s" % (a or '/* empty */'))
+            for a in alts['extra']:
+                print("        + %s" % (a or '/* empty */'))
+    print("%d missing, %d extra, %d changed rules"
+          % (len(diff['missing']), len(diff['extra']), len(diff['changed'])))
+
+
+def main():
+    args = parser.parse_args()
+    diff = p4grammar.diff_rules(read_rules(args.grammar),
+                                read_rules(args.other))
+    if args.json:
+        json.dump(diff, sys.stdout, indent=2)
+        print()
+    else:
+        print_diff(diff, args.grammar, args.other)
+    if diff['missing'] or diff['extra'] or diff['changed']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
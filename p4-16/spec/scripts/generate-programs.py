@@ -0,0 +1,401 @@
+#! /usr/bin/env python3
+
+# SPDX-FileCopyrightText: 2026 The P4 Language Consortium
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import argparse
+import bisect
+import collections
+import concurrent.futures
+import json
+import random
+import sys
+
+import p4grammar
+
+parser = argparse.ArgumentParser(description="""
+Generate random programs from the rules of a grammar file, such as
+grammar.adoc, to load-test parsers with.  Each program is derived from
+the start rule by choosing alternatives at random, in proportion to
+their weights; below --max-depth, only the alternatives that can still
+be completed within the limit are chosen, so generation always ends.
+The programs follow the grammar, not the rest of the language: names
+are not declared, and IDENTIFIER and TYPE_IDENTIFIER are told apart
+only by their spelling.  Program N of a run is the same whatever
+--jobs is, and with the same --seed, the output is the same.
+""")
+parser.add_argument('grammar', help='grammar file, e.g. grammar.adoc')
+parser.add_argument('-n', '--count', type=int, default=1,
+                    help='the number of programs (default: %(default)s)')
+parser.add_argument('--bytes', type=int, metavar='N',
+                    help='instead of --count, stop after the program that '
+                    'brings the output to N bytes')
+parser.add_argument('--seed', type=int, default=1,
+                    help='the seed of the random choices '
+                    '(default: %(default)s)')
+parser.add_argument('--start', help='the rule to derive programs from '
+                    '(default: the first rule)')
+parser.add_argument('--max-depth', type=int, default=24,
+                    help='the depth of derivation trees beyond which '
+                    'only the shallowest alternatives are chosen '
+                    '(default: %(default)s)')
+parser.add_argument('--weights', metavar='JSON',
+                    help='a JSON file giving, for a rule, the weights of '
+                    'its alternatives in order, e.g. {"expression": '
+                    '[1, 5, ...]}; other alternatives weigh 1')
+parser.add_argument('--pool-depth', type=int, default=12,
+                    help='derive samples of every rule at the depths '
+                    'below this one first, and make deeper derivations '
+                    'from them, which is much faster, but repeats those '
+                    'subtrees; 0 derives every program from scratch '
+                    '(default: %(default)s)')
+parser.add_argument('--pool-size', type=int, default=64,
+                    help='the number of samples of each rule at each of '
+                    'those depths (default: %(default)s)')
+parser.add_argument('-j', '--jobs', type=int, default=1,
+                    help='the number of processes generating programs '
+                    '(default: %(default)s)')
+parser.add_argument('--batch', type=int, default=64,
+                    help='the number of programs each process generates '
+                    'at a time (default: %(default)s)')
+parser.add_argument('-o', '--output', help='the output file '
+                    '(default: the standard output)')
+
+# How named terminals are spelled.  Keywords are spelled as
+# p4grammar.keyword_spelling() says; terminals with several spellings
+# are given one at random, and those with none, never.
+token_spellings = {
+    'IDENTIFIER': ['a', 'b', 'x', 'y', 'hdr', 'meta', 'ingress', 'f0',
+                   'f1', 'count', 'value', 'key_field', 'nextState'],
+    'TYPE_IDENTIFIER': ['T', 'H', 'M', 'E', 'Headers', 'Meta_t',
+                        'Counter', 'Parser_t'],
+    'INTEGER': ['0', '1', '2', '7', '42', '0x1f', '8w255', '32w0',
+                '16s-3', '4w0b1010'],
+    'STRING_LITERAL': ['"s"', '"name"', '"p4"'],
+    'PRAGMA': ['@pragma'],
+    'DOTS': ['...'],
+    'UNEXPECTED_TOKEN': [],
+}
+
+# Tokens after which a line ends, to keep lines short
+line_ends = set(['";"', '"{"', '"}"'])
+
+# Programs are written out a chunk of this many tokens at a time
+chunk_tokens = 4096
+
+
+class Generator(object):
+    """A random derivation machine for rules, as trim_rules() gives
+    them.  Symbols are encoded as ints: a terminal as ~index into
+    self.spellings, and a non-terminal at a remaining depth r as
+    index * (max_depth + 1) + r, which indexes self.table directly."""
+
+    def __init__(self, rules, start=None, max_depth=24, weights=None,
+                 pool_depth=0, pool_size=32, pool_seed=1):
+        weights = weights or {}
+        merged = collections.OrderedDict()
+        for name, alts in rules:
+            merged.setdefault(name, []).extend(alts)
+        if start is None:
+            start = next(iter(merged), None)
+        if start not in merged:
+            raise p4grammar.GrammarError("no rule %s" % (start))
+        for name, ws in weights.items():
+            if name not in merged:
+                raise p4grammar.GrammarError("no rule %s to weigh" % (name))
+            if len(ws) != len(merged[name]):
+                raise p4grammar.GrammarError(
+                    "rule %s has %d alternatives, not %d weights"
+                    % (name, len(merged[name]), len(ws)))
+
+        nonterminals = list(merged)
+        nt_index = dict((name, i) for i, name in enumerate(nonterminals))
+        spellings = []
+        terminal_index = {}
+        productions = []
+        for name in nonterminals:
+            alts = []
+            for i, alt in enumerate(merged[name]):
+                weight = weights.get(name, [1] * (i + 1))[i]
+                rhs = []
+                for symbol in p4grammar.alternative_symbols(alt):
+                    if symbol in nt_index:
+                        rhs.append(nt_index[symbol])
+                        continue
+                    if symbol not in terminal_index:
+                        terminal_index[symbol] = len(spellings)
+                        spellings.append(self.spell(symbol))
+                    rhs.append(~terminal_index[symbol])
+                # Alternatives with a terminal that cannot be spelled are
+                # never chosen
+                if weight > 0 and all(s >= 0 or spellings[~s]
+                                      for s in rhs):
+                    alts.append((weight, rhs))
+            productions.append(alts)
+        self.nonterminals = nonterminals
+        self.spellings = spellings
+        self.max_depth = max_depth
+
+        # The minimum height of the derivation trees of each
+        # non-terminal, and of each alternative, and the minimum number
+        # of terminals they derive
+        height, length = p4grammar.min_derivations(
+            [[rhs for _, rhs in alts] for alts in productions])
+        stuck = [nonterminals[i] for i in range(len(nonterminals))
+                 if height[i] == float('inf')]
+        if stuck:
+            raise p4grammar.GrammarError(
+                "rules that derive no finite program: %s" % (' '.join(stuck)))
+        self.min_height = dict(zip(nonterminals, height))
+        self.min_length = dict(zip(nonterminals, length))
+
+        # table[i * (max_depth + 1) + r]: the cumulative weights and the
+        # encoded, reversed right sides of the alternatives of
+        # non-terminal i that fit in the remaining depth r, or if none
+        # do, those of least height, and of these, of least length
+        width = max_depth + 1
+        table = []
+        for i, alts in enumerate(productions):
+            sizes = [(1 + max([height[s] for s in rhs if s >= 0] or [0]),
+                      sum(length[s] if s >= 0 else 1 for s in rhs))
+                     for _, rhs in alts]
+            smallest = min(sizes)
+            for r in range(width):
+                chosen = [alt for alt, (h, _) in zip(alts, sizes)
+                          if h <= r] or \
+                    [alt for alt, size in zip(alts, sizes) if size == smallest]
+                child = max(r - 1, 0)
+                cumulative = []
+                total = 0
+                encoded = []
+                for weight, rhs in chosen:
+                    total += weight
+                    cumulative.append(total)
+                    encoded.append(tuple(s * width + child if s >= 0 else s
+                                         for s in reversed(rhs)))
+                table.append((cumulative, total, encoded))
+        self.table = table
+        self.start_code = nt_index[start] * width + max_depth
+        self.make_pools(pool_depth, pool_size, pool_seed)
+        self.merge_terminals()
+
+    def make_pools(self, depth, size, seed):
+        """Derive size samples of each non-terminal at each remaining
+        depth below depth, shallowest first, and make each set of
+        samples a terminal, with the samples as its spellings, that
+        replaces the non-terminal at that depth in self.table.  Each
+        level is derived from the pools of the one below, and later
+        derivations then pick whole subtrees at once."""
+        rng = random.Random('%d/pools' % (seed))
+        width = self.max_depth + 1
+        for r in range(min(depth, width)):
+            replace = {}
+            for i in range(len(self.nonterminals)):
+                samples = []
+                for _ in range(size):
+                    chunks = []
+                    self.generate(rng, chunks.append, i * width + r)
+                    samples.append(''.join(chunks))
+                replace[i * width + r] = ~len(self.spellings)
+                self.spellings.append(samples)
+            for cumulative, total, encoded in self.table:
+                for k, rhs in enumerate(encoded):
+                    encoded[k] = tuple(replace.get(s, s) for s in rhs)
+
+    def merge_terminals(self):
+        """Replace each run of terminals that have one spelling in the
+        right sides of self.table by one terminal."""
+        merged = {}
+        for cumulative, total, encoded in self.table:
+            for k, rhs in enumerate(encoded):
+                new = []
+                for s in rhs:
+                    if (s < 0 and len(self.spellings[~s]) == 1 and new and
+                            new[-1] < 0 and len(self.spellings[~new[-1]]) == 1):
+                        # rhs is reversed: s comes before new[-1]
+                        text = self.spellings[~s][0] + \
+                            self.spellings[~new[-1]][0]
+                        if text not in merged:
+                            merged[text] = ~len(self.spellings)
+                            self.spellings.append([text])
+                        new[-1] = merged[text]
+                    else:
+                        new.append(s)
+                encoded[k] = tuple(new)
+
+    @staticmethod
+    def spell(terminal):
+        if terminal.startswith('"'):
+            text = terminal[1:-1]
+            return [text + ('\n' if terminal in line_ends else ' ')]
+        if terminal in token_spellings:
+            return [s + ' ' for s in token_spellings[terminal]]
+        word = p4grammar.keyword_spelling(terminal)
+        if word is None:
+            return []
+        return [word + ' ']
+
+    def generate(self, rng, write, start=None):
+        """Derive a program, or a derivation of start, an encoded
+        non-terminal, choosing with rng, and write it in chunks with
+        write()."""
+        table = self.table
+        spellings = self.spellings
+        uniform = rng.random
+        choose = bisect.bisect_right
+        out = []
+        emit = out.append
+        stack = [self.start_code if start is None else start]
+        pop = stack.pop
+        push = stack.extend
+        while stack:
+            code = pop()
+            if code < 0:
+                texts = spellings[~code]
+                if len(texts) == 1:
+                    emit(texts[0])
+                else:
+                    emit(texts[int(uniform() * len(texts))])
+                if len(out) >= chunk_tokens:
+                    write(''.join(out))
+                    del out[:]
+                continue
+            cumulative, total, encoded = table[code]
+            if len(encoded) == 1:
+                push(encoded[0])
+            else:
+                push(encoded[choose(cumulative, uniform() * total)])
+        if start is None:
+            out.append('\n')
+        write(''.join(out))
+
+
+def program_rng(seed, number):
+    """Return the random number generator of program number of a run,
+    which does not depend on the programs before it."""
+    return random.Random('%d/%d' % (seed, number))
+
+
+# Each worker process builds its own generator, once
+worker_generator = None
+
+
+def init_worker(rules, args, weights):
+    global worker_generator
+    worker_generator = make_generator(rules, args, weights)
+
+
+def make_generator(rules, args, weights):
+    return Generator(rules, args.start, args.max_depth, weights,
+                     args.pool_depth, args.pool_size, args.seed)
+
+
+def generate_batch(seed, first, count):
+    """Return the text of programs first to first + count - 1."""
+    chunks = []
+    for number in range(first, first + count):
+        chunks.append('// program %d, seed %d\n' % (number, seed))
+        worker_generator.generate(program_rng(seed, number), chunks.append)
+    return ''.join(chunks)
+
+
+def generate_serial(generator, args, outfile):
+    written = 0
+    number = 0
+    while number < args.count if args.bytes is None else written < args.bytes:
+        header = '// program %d, seed %d\n' % (number, args.seed)
+        outfile.write(header)
+        written += len(header)
+
+        def write(text):
+            nonlocal written
+            written += len(text)
+            outfile.write(text)
+
+        generator.generate(program_rng(args.seed, number), write)
+        number += 1
+    return number, written
+
+
+def generate_parallel(args, rules, weights, outfile):
+    """Generate batches of programs in worker processes, and write them
+    in order, keeping at most two batches per worker in memory."""
+    written = 0
+    number = 0
+    pending = collections.deque()
+    first = 0
+
+    def more():
+        if args.bytes is not None:
+            return True
+        return first < args.count
+
+    with concurrent.futures.ProcessPoolExecutor(
+            args.jobs, initializer=init_worker,
+            initargs=(rules, args, weights)) as pool:
+        while True:
+            while more() and len(pending) < 2 * args.jobs:
+                count = args.batch
+                if args.bytes is None:
+                    count = min(count, args.count - first)
+                pending.append((count, pool.submit(generate_batch, args.seed,
+                                                   first, count)))
+                first += count
+            if not pending:
+                break
+            count, future = pending.popleft()
+            text = future.result()
+            if args.bytes is not None:
+                # Stop after the program that reaches the limit, as a
+                # single process would
+                starts = []
+                offset = 0
+                for _ in range(count):
+                    starts.append(text.index('// program ', offset))
+                    offset = starts[-1] + 1
+                for i, start in enumerate(starts):
+                    if written + start >= args.bytes:
+                        text = text[:start]
+                        count = i
+                        break
+            outfile.write(text)
+            written += len(text)
+            number += count
+            if args.bytes is not None and written >= args.bytes:
+                for _, future in pending:
+                    future.cancel()
+                break
+    return number, written
+
+
+def main():
+    args = parser.parse_args()
+    weights = None
+    try:
+        rules = p4grammar.read_rules(args.grammar)
+        if args.weights:
+            with open(args.weights) as infile:
+                weights = json.load(infile)
+        generator = make_generator(rules, args, weights)
+    except p4grammar.GrammarError as e:
+        sys.exit("%s: %s" % (args.grammar, e))
+    except (OSError, ValueError) as e:
+        sys.exit(str(e))
+
+    outfile = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        if args.jobs > 1:
+            number, written = generate_parallel(args, rules, weights, outfile)
+        else:
+            number, written = generate_serial(generator, args, outfile)
+    except BrokenPipeError:
+        sys.exit(1)
+    finally:
+        if args.output:
+            outfile.close()
+    print("%d programs, %d bytes" % (number, written), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
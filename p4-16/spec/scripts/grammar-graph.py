@@ -0,0 +1,102 @@
+#! /usr/bin/env python3
+
+# SPDX-FileCopyrightText: 2026 The P4 Language Consortium
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import argparse
+import json
+import sys
+
+import p4grammar
+import p4graph
+
+parser = argparse.ArgumentParser(description="""
+Report on the dependency graph of the non-terminals of a grammar file,
+a grammar.adoc file, the output of trim-p4-grammar-file.py or a Bison
+file like p4c's p4parser.ypp.  By default, lists the dead rules, those
+the start rule does not use, directly or not, and those that derive no
+string of terminals, and the cycles of rules that use each other, and
+exits with status 1 if there are dead rules.  The other options answer
+questions about particular rules instead.
+""")
+parser.add_argument('grammar', help='grammar file, e.g. grammar.adoc')
+parser.add_argument('--start', help='the start rule (default: the first '
+                    'rule)')
+parser.add_argument('--uses', metavar='RULE',
+                    help='list the rules RULE uses, directly or not')
+parser.add_argument('--used-by', metavar='RULE',
+                    help='list the rules that use RULE, directly or not')
+parser.add_argument('--path', nargs=2, metavar=('FROM', 'TO'),
+                    help='print a shortest chain of rules from FROM to TO, '
+                    'each using the next')
+parser.add_argument('--left-recursive', action='store_true',
+                    help='also list the left-recursive rules')
+parser.add_argument('--json', action='store_true',
+                    help='print the graph, its closures and the reports '
+                    'as JSON')
+
+
+def check_rule(graph, name):
+    if name not in graph.index:
+        sys.exit("%s: no rule %s" % (parser.prog, name))
+
+
+def print_list(title, names):
+    print("%s:" % (title))
+    for name in names:
+        print("    %s" % (name))
+
+
+def main():
+    args = parser.parse_args()
+    try:
+        graph = p4graph.GrammarGraph(p4grammar.read_rules(args.grammar),
+                                     args.start)
+    except p4grammar.GrammarError as e:
+        sys.exit("%s: %s" % (args.grammar, e))
+    except OSError as e:
+        sys.exit(str(e))
+
+    if args.json:
+        json.dump(graph.to_dict(), sys.stdout, indent=1)
+        print()
+        return
+    if args.uses or args.used_by or args.path:
+        for name in [args.uses, args.used_by] + (args.path or []):
+            if name:
+                check_rule(graph, name)
+        if args.uses:
+            print('\n'.join(graph.dependencies(args.uses)))
+        if args.used_by:
+            print('\n'.join(graph.dependents(args.used_by)))
+        if args.path:
+            path = graph.path(*args.path)
+            if path is None:
+                sys.exit("%s does not use %s" % tuple(args.path))
+            print(' -> '.join(path))
+        return
+
+    unreachable = graph.unreachable()
+    unproductive = graph.unproductive()
+    if unreachable:
+        print_list("Rules %s does not use" % (graph.names[graph.start]),
+                   unreachable)
+    if unproductive:
+        print_list("Rules that derive no string of terminals", unproductive)
+    cycles = graph.cycles()
+    if cycles:
+        print("Cycles of rules that use each other:")
+        for cycle in cycles:
+            print("    %s" % (' '.join(cycle)))
+    if args.left_recursive:
+        print_list("Left-recursive rules", graph.left_recursive())
+    print("%d rules, %d unused, %d unproductive, %d cycles"
+          % (len(graph.names), len(unreachable), len(unproductive),
+             len(cycles)))
+    if unreachable or unproductive:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
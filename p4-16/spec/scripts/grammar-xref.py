@@ -0,0 +1,349 @@
+#! /usr/bin/env python3
+
+# SPDX-FileCopyrightText: 2026 The P4 Language Consortium
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+
+import p4grammar
+
+spec_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+tools_dir = os.path.join(spec_dir, os.pardir, os.pardir, 'tools')
+sys.path.insert(0, tools_dir)
+import adoctags
+
+parser = argparse.ArgumentParser(description="""
+Look up where the specification shows and mentions the rules of its
+grammar: for each non-terminal, the tag regions of grammar.adoc that
+define it, the sections that include one of those regions, and the
+sections whose text mentions it.  A rule is mentioned where its name
+appears in backquotes, or anywhere outside listings for names that are
+not plain lowercase words, such as typeRef.  The answers come from an
+index, which is brought up to date first if the specification or the
+grammar changed, reading again only the sections whose text changed.
+With no rule, prints the number of rules shown and mentioned.
+""")
+parser.add_argument('rules', metavar='rule', nargs='*')
+parser.add_argument('--spec', default=os.path.join(spec_dir,
+                                                   'P4-16-spec.adoc'),
+                    help='the specification (default: %(default)s)')
+parser.add_argument('--grammar', default=os.path.join(spec_dir,
+                                                      'grammar.adoc'),
+                    help='its grammar (default: %(default)s)')
+parser.add_argument('--fragments', default='build/grammar-tags',
+                    help='the directory, relative to the specification, '
+                    'of the files with one tag region of the grammar each '
+                    '(default: %(default)s)')
+parser.add_argument('--index', help='the index file (default: '
+                    'build/grammar-xref.json next to the specification)')
+parser.add_argument('--rebuild', action='store_true',
+                    help='read every section again')
+parser.add_argument('--unshown', action='store_true',
+                    help='list the rules that no section shows, apart from '
+                    'the complete grammar')
+parser.add_argument('--json', action='store_true',
+                    help='print the entries of the rules as JSON')
+
+heading_re = re.compile(r"^(=+)\s+(\S.*?)\s*$")
+anchor_re = re.compile(r"^\[(?:#([\w:.-]+)[^\]]*|\[([\w:.-]+)(?:,[^\]]*)?\])\]\s*$")
+block_re = re.compile(r"^(-{4,}|\.{4,}|/{4,})\s*$")
+code_word_re = re.compile(r"`\+?([A-Za-z_]\w*)\+?`")
+word_re = re.compile(r"[A-Za-z_]\w*")
+plain_word_re = re.compile(r"^[a-z]+$")
+
+# The index depends on this file and on how adoctags reads includes
+digest = hashlib.sha1()
+for module in (os.path.abspath(__file__), adoctags.__file__):
+    with open(module, 'rb') as script:
+        digest.update(script.read())
+engine = digest.hexdigest()
+
+
+class Section(object):
+    """A section of the specification: its heading, the number of the
+    line it is on, and its text up to the next heading."""
+
+    def __init__(self, level, title, anchor, line, appendix):
+        self.level = level
+        self.title = title
+        self.anchor = anchor
+        self.line = line
+        self.appendix = appendix
+        self.number = ''
+        self.lines = []
+
+    def digest(self):
+        return hashlib.sha1('\n'.join(self.lines).encode('utf-8')).hexdigest()
+
+    def to_dict(self):
+        return {'id': self.anchor, 'title': self.title, 'level': self.level,
+                'number': self.number, 'line': self.line,
+                'digest': self.digest()}
+
+
+def split_sections(fname):
+    """Return the sections of an AsciiDoc file, the text before the
+    first heading being a section of level 0, and number them as
+    asciidoctor does for a book."""
+    sections = [Section(0, '', None, 1, False)]
+    anchor = None
+    appendix = False
+    block = None
+    with open(fname) as infile:
+        for number, line in enumerate(infile, 1):
+            line = line.rstrip('\n')
+            if block is None:
+                match = heading_re.match(line)
+                if match:
+                    level = len(match.group(1)) - 1
+                    sections.append(Section(level, match.group(2), anchor,
+                                            number, appendix))
+                    anchor = None
+                    appendix = False
+                    continue
+                match = anchor_re.match(line)
+                if match:
+                    anchor = match.group(1) or match.group(2)
+                elif line.strip() == '[appendix]':
+                    appendix = True
+                elif line.strip() and not line.startswith('['):
+                    anchor = None
+                    appendix = False
+            match = block_re.match(line)
+            if match:
+                if block is None:
+                    block = match.group(1)
+                elif line.rstrip() == block:
+                    block = None
+            sections[-1].lines.append(line)
+
+    counters = []
+    chapter = None
+    appendices = 0
+    for section in sections[1:]:
+        if section.level < 1:
+            continue
+        del counters[section.level:]
+        counters.extend([0] * (section.level - len(counters)))
+        counters[-1] += 1
+        if section.level == 1:
+            if section.appendix:
+                appendices += 1
+                chapter = chr(ord('A') + appendices - 1)
+            else:
+                chapter = str(counters[0])
+        section.number = '.'.join([chapter] + [str(c) for c in counters[1:]])
+    return sections
+
+
+def extract(lines, grammar_names, fragments):
+    """Return what a section includes from the grammar, and the words
+    that may mention rules, with the line of the first mention and the
+    number of mentions, relative to the start of the section.  Included
+    tag regions are ('tag', name) pairs, and the complete grammar is
+    ('all', None)."""
+    includes = []
+    mentions = {}
+    block = None
+    for offset, line in enumerate(lines):
+        include = adoctags.parse_include(line)
+        if include is not None:
+            target, tags = include
+            directory, name = os.path.split(os.path.normpath(target))
+            if name in grammar_names:
+                if tags:
+                    includes.extend([offset, 'tag', t] for t in tags)
+                else:
+                    includes.append([offset, 'all', None])
+            elif directory == fragments and name.endswith('.adoc'):
+                includes.append([offset, 'tag', name[:-len('.adoc')]])
+            continue
+        match = block_re.match(line)
+        if match:
+            if block is None:
+                block = match.group(1)
+            elif line.rstrip() == block:
+                block = None
+            continue
+        if block is not None or line.startswith('//'):
+            continue
+        words = set(code_word_re.findall(line))
+        words.update(w for w in word_re.findall(line)
+                     if not plain_word_re.match(w))
+        for word in words:
+            entry = mentions.setdefault(word, [offset, 0])
+            entry[1] += 1
+    return {'includes': includes, 'mentions': mentions}
+
+
+def file_state(fname):
+    stat = os.stat(fname)
+    return {'path': os.path.abspath(fname), 'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size}
+
+
+def build_index(args, old):
+    """Return the index, reading again only the sections whose text is
+    not in the old index."""
+    grammar = p4grammar.load_grammar(args.grammar)
+    sections = split_sections(args.spec)
+    base = os.path.basename(args.grammar)
+    grammar_names = set([base, base[:-len('.adoc')] + '.trimmed.adoc'])
+    fragments = os.path.normpath(args.fragments)
+    cached = old.get('extracted', {}) if not args.rebuild else {}
+    extracted = {}
+    read = 0
+    for section in sections:
+        digest = section.digest()
+        if digest not in extracted:
+            if digest in cached:
+                extracted[digest] = cached[digest]
+            else:
+                extracted[digest] = extract(section.lines, grammar_names,
+                                            fragments)
+                read += 1
+
+    rules = dict((rule.name, {
+        'lines': [rule.first_line, rule.last_line],
+        'tags': rule.tags,
+        'shown': [],
+        'mentioned': [],
+    }) for rule in grammar.rules.values())
+    unknown_tags = []
+    for s, section in enumerate(sections):
+        found = extracted[section.digest()]
+        for offset, kind, tag in found['includes']:
+            if kind == 'all':
+                names = list(grammar.rules)
+            elif tag in grammar.tags:
+                names = grammar.tags[tag].rules
+            else:
+                unknown_tags.append([tag, section.line + offset])
+                continue
+            for name in names:
+                rules[name]['shown'].append([s, section.line + offset])
+        for name, (offset, count) in found['mentions'].items():
+            if name in rules:
+                rules[name]['mentioned'].append(
+                    [s, section.line + offset, count])
+    return {
+        'engine': engine,
+        'spec': file_state(args.spec),
+        'grammar': file_state(args.grammar),
+        'sections': [section.to_dict() for section in sections],
+        'extracted': extracted,
+        'rules': rules,
+        'unknown_tags': unknown_tags,
+    }, read
+
+
+def load_index(args):
+    """Return the index, brought up to date if need be, and the number
+    of sections read to do so."""
+    try:
+        with open(args.index) as infile:
+            index = json.load(infile)
+    except (OSError, ValueError):
+        index = {}
+    if (not args.rebuild and index.get('engine') == engine and
+            index.get('spec') == file_state(args.spec) and
+            index.get('grammar') == file_state(args.grammar)):
+        return index, 0
+    if index.get('engine') != engine:
+        index = {}
+    index, read = build_index(args, index)
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(args.index)),
+                    exist_ok=True)
+        with open(args.index + '.tmp', 'w') as outfile:
+            json.dump(index, outfile, separators=(',', ':'))
+        os.replace(args.index + '.tmp', args.index)
+    except OSError as e:
+        print("%s: cannot write %s: %s" % (parser.prog, args.index,
+                                           e.strerror), file=sys.stderr)
+    return index, read
+
+
+def describe(section):
+    title = section['title'] or '(preamble)'
+    if section['number']:
+        title = '%s %s' % (section['number'], title)
+    if section['id']:
+        title += ' [%s]' % (section['id'])
+    return title
+
+
+def print_entry(index, name, entry):
+    sections = index['sections']
+    spec = os.path.relpath(index['spec']['path'])
+    grammar = os.path.relpath(index['grammar']['path'])
+    print("%s" % (name))
+    print("    defined at %s:%d-%d%s"
+          % (grammar, entry['lines'][0], entry['lines'][1],
+             ', in tag %s' % (' > '.join(entry['tags']))
+             if entry['tags'] else ''))
+    if entry['shown']:
+        print("    shown in:")
+        for s, line in entry['shown']:
+            print("        %s:%d: %s" % (spec, line, describe(sections[s])))
+    if entry['mentioned']:
+        print("    mentioned in:")
+        for s, line, count in entry['mentioned']:
+            print("        %s:%d: %s%s" % (spec, line, describe(sections[s]),
+                                          ' (%d lines)' % (count)
+                                          if count > 1 else ''))
+
+
+def main():
+    args = parser.parse_args()
+    if args.index is None:
+        args.index = os.path.join(os.path.dirname(os.path.abspath(args.spec)),
+                                  'build', 'grammar-xref.json')
+    try:
+        index, read = load_index(args)
+    except p4grammar.GrammarError as e:
+        sys.exit("%s: %s" % (args.grammar, e))
+    except OSError as e:
+        sys.exit(str(e))
+
+    rules = index['rules']
+    missing = [name for name in args.rules if name not in rules]
+    if missing:
+        sys.exit("no rule %s in %s" % (', '.join(missing), args.grammar))
+    if args.json:
+        json.dump(dict((name, rules[name]) for name in args.rules), sys.stdout,
+                  indent=1)
+        print()
+    for name in [] if args.json else args.rules:
+        print_entry(index, name, rules[name])
+    shown = [name for name, entry in rules.items()
+             if any(not is_complete_grammar(index, s)
+                    for s, line in entry['shown'])]
+    if args.unshown:
+        for name in rules:
+            if name not in shown:
+                print(name)
+    if not args.rules and not args.unshown:
+        mentioned = sum(1 for entry in rules.values() if entry['mentioned'])
+        print("%d rules, %d sections (%d read again): %d rules shown, "
+              "%d mentioned" % (len(rules), len(index['sections']), read,
+                                len(shown), mentioned))
+    for tag, line in index['unknown_tags']:
+        print("%s:%d: no tag %s in %s" % (os.path.relpath(args.spec), line,
+                                          tag, args.grammar), file=sys.stderr)
+
+
+def is_complete_grammar(index, s):
+    """Whether section s includes the complete grammar."""
+    found = index['extracted'][index['sections'][s]['digest']]
+    return any(kind == 'all' for _, kind, _ in found['includes'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+#! /usr/bin/env python3
+
+# SPDX-FileCopyrightText: 2026 The P4 Language Consortium
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import argparse
+import json
+import re
+import sys
+
+import p4grammar
+
+parser = argparse.ArgumentParser(description="""
+Update the keyword lists of a highlighter definition like
+p4-16/psa/p4.json from the keyword terminals of a grammar.adoc file,
+such as RETURN for the return keyword.  Keywords the definition lists
+that are not terminals of the grammar are kept, in its extraKeywords
+and extraTypeKeywords lists.  Optionally, also write a JSON object from
+each keyword to its token class, so that a lexer can look a word up
+instead of searching the lists.
+""")
+parser.add_argument('grammar')
+parser.add_argument('highlighter')
+parser.add_argument('--check', action='store_true',
+                    help='leave the highlighter file alone, and exit with '
+                    'status 1 if it is not up to date')
+parser.add_argument('--lookup', metavar='JSON',
+                    help='write the keyword lookup table to JSON')
+
+# A keyword that the definition does not list yet is a type keyword if
+# one of these rules uses it
+type_rules = set(['baseType', 'direction', 'typeOrVoid', 'typeArg',
+                  'realTypeArg', 'tupleType', 'p4listType',
+                  'headerTypeDeclaration', 'headerUnionDeclaration',
+                  'structTypeDeclaration', 'enumDeclaration'])
+
+# The token class of the words in each list, as the tokenizer of the
+# definition gives them
+token_classes = [
+    ('keywords', 'keyword'),
+    ('typeKeywords', 'keyword.type'),
+    ('extraKeywords', 'keyword.extra'),
+    ('extraTypeKeywords', 'keyword.type.extra'),
+]
+
+list_re_format = r'\n[ \t]*"%s"\s*:\s*\[([^\]]*)\]'
+
+# The keyword lists are written with the indentation of the other lists
+# of p4.json, whatever the indentation they had
+list_indent = '  '
+
+
+def grammar_keywords(grammar):
+    """
+    Return a dict from the spelling of each keyword terminal of grammar
+    to the names of the rules using it
+    """
+    keywords = {}
+    for terminal, users in grammar.terminals().items():
+        word = p4grammar.keyword_spelling(terminal)
+        if word is not None:
+            keywords[word] = users
+    return keywords
+
+
+def classify(keywords, lists):
+    """
+    Return the new keyword lists of a definition, given the keywords of
+    the grammar and the definition's current lists
+    """
+    listed_types = set(lists['typeKeywords'] + lists['extraTypeKeywords'])
+    listed = listed_types | set(lists['keywords'] + lists['extraKeywords'])
+    new = dict((name, []) for name, _ in token_classes)
+    for word, users in keywords.items():
+        if word in listed_types or (word not in listed and
+                                    type_rules.intersection(users)):
+            new['typeKeywords'].append(word)
+        else:
+            new['keywords'].append(word)
+    for name, extra in [('keywords', 'extraKeywords'),
+                        ('typeKeywords', 'extraTypeKeywords')]:
+        new[extra] = [w for w in lists[name] + lists[extra]
+                      if w not in keywords]
+    for name in new:
+        new[name] = sorted(set(new[name]))
+    return new
+
+
+def format_list(words, indent):
+    """
+    Format words as a JSON array, a few to a line
+    """
+    if not words:
+        return '[]'
+    lines = []
+    line = ''
+    for word in words:
+        item = json.dumps(word) + ','
+        if line and len(indent) + 2 + len(line) + len(item) > 72:
+            lines.append(line)
+            line = ''
+        line += (' ' if line else '') + item
+    lines.append(line[:-1])
+    return '[\n%s\n%s]' % ('\n'.join(indent + '  ' + l for l in lines), indent)
+
+
+def update(text, keywords):
+    """
+    Return the text of a definition with its keyword lists replaced,
+    and the lists
+    """
+    lists = {}
+    for name, _ in token_classes:
+        match = re.search(list_re_format % name, text)
+        if match is None:
+            raise ValueError("no %s list" % name)
+        lists[name] = json.loads('[%s]' % match.group(1))
+    new = classify(keywords, lists)
+    for name, _ in token_classes:
+        text = re.sub(list_re_format % name,
+                      lambda m: '\n%s"%s": %s' % (
+                          list_indent, name,
+                          format_list(new[name], list_indent)),
+                      text, count=1)
+    return text, new
+
+
+def lookup_table(lists):
+    table = {}
+    for name, token_class in token_classes:
+        for word in lists[name]:
+            table[word] = token_class
+    return table
+
+
+def main():
+    args = parser.parse_args()
+    try:
+        keywords = grammar_keywords(p4grammar.load_grammar(args.grammar))
+    except p4grammar.GrammarError as e:
+        sys.exit("%s: %s" % (args.grammar, e))
+    with open(args.highlighter) as infile:
+        text = infile.read()
+    try:
+        new_text, lists = update(text, keywords)
+        json.loads(new_text)
+    except ValueError as e:
+        sys.exit("%s: %s" % (args.highlighter, e))
+
+    if args.lookup:
+        with open(args.lookup, 'w') as outfile:
+            json.dump(lookup_table(lists), outfile, sort_keys=True,
+                      separators=(',', ':'))
+            outfile.write('\n')
+    if new_text == text:
+        return
+    if args.check:
+        sys.exit("%s: the keyword lists do not match %s; run %s to "
+                 "update them" % (args.highlighter, args.grammar, parser.prog))
+    with open(args.highlighter, 'w') as outfile:
+        outfile.write(new_text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,588 @@
+#! /usr/bin/env python3
+
+# SPDX-FileCopyrightText: 2026 The P4 Language Consortium
+#
+# SPDX-License-Identifier: Apache-2.0
+
+# Reading the grammar rules of a grammar.adoc file from this
+# repository, or of a Bison grammar file like p4c's p4parser.ypp, with
+# the C++ code and various other things trimmed, so that the two can
+# be compared.  The rules of grammar.adoc can also be read into a
+# model that records where each rule is and which tag regions hold it,
+# and that is cached, so that tools do not each parse the file again.
+
+import fileinput
+import hashlib
+import json
+import os
+import re
+import sys
+
+
+class GrammarError(Exception):
+    pass
+
+
+def read_grammar(filename):
+    """Return the grammar rules of the file as one big string."""
+    lines = []
+    keep = False
+    with fileinput.input(files=(filename)) as infile:
+        for line in infile:
+            match1 = re.match(r"^program\s*:", line)
+            match2 = re.match(r"^p4program", line)
+            if match1 or match2:
+                keep = True
+            if keep:
+                match3 = re.match(r"^%%", line)
+                match4 = re.match(r"^~ End P4Grammar", line)
+                if match3 or match4:
+                    break
+                lines.append(line)
+    return ''.join(lines)
+
+
+# Remove all balanced sets of curly braces, and whatever is between
+# them, in one pass over the text.  Quoted strings, character literals
+# and comments are skipped over as a whole, so that braces within them
+# are not counted, both within the C++ code in { } and outside of it.
+#
+# Outside of the braces, the contents of strings in single quotes are
+# copied within double quotes instead, so that both kinds of string
+# look the same in the output.  The characters ; : | and / within
+# strings are replaced with control characters, so that the simple
+# splitting and comment removal below can ignore strings, and restored
+# at the end.
+
+# Split text into the braces, the strings, character literals and
+# comments, each as a whole, and the text between them.  Unterminated
+# strings and comments run to the end of the line or text.  Actions
+# with no braces, strings or comments inside, which are most of them,
+# are kept whole as well, so that the loop below sees them as one token.
+token_re = re.compile(r"""
+  ( \{[^{}"'/]*\}
+  | [{}]
+  | "[^"\\\n]*(?:\\.[^"\\\n]*)*(?:"|$)
+  | '[^'\\\n]*(?:\\.[^'\\\n]*)*(?:'|$)
+  | //[^\n]*
+  | /\*.*?(?:\*/|\Z)
+  )
+""", re.VERBOSE | re.DOTALL | re.MULTILINE)
+
+hide_specials = str.maketrans(';:|/', '\x00\x01\x02\x03')
+show_specials = str.maketrans('\x00\x01\x02\x03', ';:|/')
+
+
+def strip_braces(content):
+    parts = token_re.split(content)
+    pieces = [parts[0]]
+    depth = 0
+    # parts alternates between the text between tokens and the tokens
+    for i in range(1, len(parts), 2):
+        token = parts[i]
+        if depth == 0:
+            if token == '{':
+                depth = 1
+                continue
+            if token[0] == '"':
+                pieces.append(token.translate(hide_specials))
+            elif token[0] == "'":
+                pieces.append('"%s"' % (token[1:-1].translate(hide_specials)))
+            elif token[0] != '{':
+                # A comment, or an unbalanced }, is left in place
+                pieces.append(token)
+            pieces.append(parts[i + 1])
+        elif token == '{':
+            depth += 1
+        elif token == '}':
+            depth -= 1
+            if depth == 0:
+                pieces.append(parts[i + 1])
+    return ''.join(pieces)
+
+
+def trim_rules(content):
+    """Return the rules of a grammar, as a list of (non-terminal,
+    alternatives) pairs."""
+    content = re.sub('l_angle', '"<"', content)
+    content = re.sub('r_angle', '">"', content)
+
+    content = strip_braces(content)
+
+    content = re.sub('%empty', '/* empty */', content)
+
+    # Remove blank lines that occur in the middle of the definition of a
+    # non-terminal.  Relies on the following assumptions, which are
+    # currently true of the file p4parser.ypp:
+
+    # + Non-terminals are first non-whitespace character on a line.
+    # + The ';' ending the definition of a non-terminal is always on a
+    #   line by itself.
+
+    lines = content.split('\n')
+
+    for i in range(len(lines)):
+        if lines[i][0:1] == '%':
+            lines[i] = ''
+        # Remove end-of line comments beginning with //
+        lines[i] = re.sub(r"//.*$", "", lines[i])
+        # Remove comments of the form /* ... */
+        lines[i] = re.sub(r"/\*.*\*/", "", lines[i])
+        # Remove end-of-line whitespace
+        lines[i] = lines[i].rstrip()
+
+    content = ' '.join(lines)
+
+    # Split the grammar into rules, and each rule into its
+    # alternatives.
+    rules = content.split(';')
+    result = []
+    for i in range(len(rules)):
+        rule = rules[i].strip()
+        if (i == len(rules) - 1) and (rule == ''):
+            break
+        xs = rule.split(':')
+        if len(xs) != 2:
+            raise GrammarError("cannot split rule %d into a non-terminal "
+                               "and its alternatives: %s"
+                               % (i, rule.translate(show_specials)))
+        nonterminal_name = xs[0].strip().translate(show_specials)
+        alts = [a.strip().translate(show_specials) for a in xs[1].split('|')]
+        result.append((nonterminal_name, alts))
+    return result
+
+
+def format_rules(rules):
+    """Format rules so that each alternative appears on exactly one line."""
+    lines = []
+    for nonterminal_name, alts in rules:
+        lines.append('')
+        lines.append(nonterminal_name)
+        for j in range(len(alts)):
+            ln = '    '
+            if j == 0:
+                ln += ':'
+            else:
+                ln += '|'
+            a = alts[j]
+            if a != '':
+                ln += (' ' + a)
+            lines.append(ln)
+        lines.append('    ;')
+    return '\n'.join(lines)
+
+
+def trim(content):
+    return format_rules(trim_rules(content))
+
+
+# Comparing grammars.  Each grammar is reduced to a map from each
+# non-terminal to the set of its alternatives, so that the order of the
+# rules and of their alternatives, and the white space within them,
+# make no difference.  Bison's %prec annotations, which only resolve
+# conflicts, are dropped as well.
+
+prec_re = re.compile(r"%prec\s+\S+")
+
+
+def normalize_alternative(alt):
+    return ' '.join(prec_re.sub('', alt).split())
+
+
+# The symbols of an alternative: non-terminals and named terminals,
+# such as RETURN, are identifiers, and the other terminals are quoted.
+
+symbol_re = re.compile(r'"[^"]*"|[A-Za-z_][0-9A-Za-z_]*')
+
+
+def alternative_symbols(alt):
+    """Return the symbols of an alternative, in order, without the
+    %prec annotation."""
+    return symbol_re.findall(prec_re.sub('', alt))
+
+
+# Named terminals that are not keywords
+non_keywords = set(['IDENTIFIER', 'TYPE_IDENTIFIER', 'INTEGER',
+                    'STRING_LITERAL', 'PRAGMA', 'DOTS', 'PREFIX',
+                    'UNEXPECTED_TOKEN'])
+
+# Keywords that are not spelled as their terminal in lowercase
+keyword_spellings = {'VALUESET': 'value_set'}
+
+
+def keyword_spelling(terminal):
+    """Return the keyword a terminal such as RETURN stands for, or
+    None if it is quoted or another named terminal."""
+    if terminal.startswith('"') or terminal in non_keywords:
+        return None
+    return keyword_spellings.get(terminal, terminal.lower())
+
+
+def rule_sets(rules):
+    """Return a dict from each non-terminal of rules, in order, to the
+    set of its normalized alternatives."""
+    sets = {}
+    for nonterminal_name, alts in rules:
+        alt_set = sets.setdefault(nonterminal_name, set())
+        alt_set.update(normalize_alternative(a) for a in alts)
+    return sets
+
+
+def diff_rules(old_rules, new_rules):
+    """Compare two lists of rules, and return a dict with:
+      missing: the non-terminals only defined in old_rules
+      extra: the non-terminals only defined in new_rules
+      changed: for each non-terminal defined in both but with different
+               alternatives, a dict with the alternatives that are
+               missing from new_rules and those that are extra in it
+    Every list is sorted, other than those of non-terminals, which are
+    in the order of the grammar that defines them."""
+    old = rule_sets(old_rules)
+    new = rule_sets(new_rules)
+    changed = {}
+    for name in old:
+        if name in new and old[name] != new[name]:
+            changed[name] = {
+                'missing': sorted(old[name] - new[name]),
+                'extra': sorted(new[name] - old[name]),
+            }
+    return {
+        'missing': [name for name in old if name not in new],
+        'extra': [name for name in new if name not in old],
+        'changed': changed,
+    }
+
+
+# Properties of the non-terminals that are found as fixpoints.  Each
+# non-terminal is given by the list of its alternatives, and each
+# alternative by the list of its symbols: the number of a non-terminal,
+# counting from 0, or a negative number for a terminal.  Sets of
+# non-terminals or terminals are ints used as bitsets, with bit i for
+# number i.
+
+def bits(n):
+    """Generate the numbers of the bits set in n."""
+    while n:
+        low = n & -n
+        yield low.bit_length() - 1
+        n ^= low
+
+
+def nullable_rules(productions):
+    """Return, for each non-terminal, whether it derives the empty
+    string."""
+    nullable = [False] * len(productions)
+    changed = True
+    while changed:
+        changed = False
+        for i, alts in enumerate(productions):
+            if nullable[i]:
+                continue
+            for alt in alts:
+                if all(s >= 0 and nullable[s] for s in alt):
+                    nullable[i] = changed = True
+                    break
+    return nullable
+
+
+def min_derivations(productions):
+    """Return, for each non-terminal, the minimum height of its
+    derivation trees and the minimum number of terminals it derives,
+    both float('inf') for a non-terminal that derives no string of
+    terminals."""
+    infinity = float('inf')
+    height = [infinity] * len(productions)
+    length = [infinity] * len(productions)
+    changed = True
+    while changed:
+        changed = False
+        for i, alts in enumerate(productions):
+            for alt in alts:
+                h = 1 + max([height[s] for s in alt if s >= 0] or [0])
+                n = sum(length[s] if s >= 0 else 1 for s in alt)
+                if h < height[i]:
+                    height[i] = h
+                    changed = True
+                if n < length[i]:
+                    length[i] = n
+                    changed = True
+    return height, length
+
+
+# The grammar model
+
+tag_re = re.compile(r"^// (tag|end)::([^\[]*)\[\]")
+rule_start_re = re.compile(r"^([A-Za-z_][0-9A-Za-z_]*)\s*(:|$)")
+
+
+class Rule(object):
+    """A rule of the grammar: the non-terminal it defines, its
+    alternatives as trim_rules() returns them, the first and last
+    line numbers (counting from 1) of its text, and the names of the
+    tag regions it is in, innermost last.  A non-terminal defined more
+    than once is one rule, as for Bison, with the alternatives of each
+    definition in turn; first_line and last_line are those of the
+    first definition, definitions has the first and last line numbers
+    of each, and tags has the tag regions of any of them."""
+
+    def __init__(self, name, alternatives, first_line, last_line, tags,
+                 definitions=None):
+        self.name = name
+        self.alternatives = alternatives
+        self.first_line = first_line
+        self.last_line = last_line
+        self.tags = tags
+        self.definitions = definitions or [[first_line, last_line]]
+
+    def add_definition(self, alternatives, first_line, last_line, tags):
+        self.alternatives.extend(alternatives)
+        self.definitions.append([first_line, last_line])
+        self.tags.extend(t for t in tags if t not in self.tags)
+
+    def to_dict(self):
+        return dict(self.__dict__)
+
+
+class TagRegion(object):
+    """A region of the file between a tag:: line and the matching
+    end:: line, with their line numbers, and the names of the rules
+    defined within it.  A tag used more than once is one TagRegion,
+    as asciidoctor includes the regions of a tag one after another;
+    start_line and end_line are those of the first region, regions
+    has the tag:: and end:: line numbers of each, and rules has the
+    rules of any of them."""
+
+    def __init__(self, name, start_line, end_line, rules, regions=None):
+        self.name = name
+        self.start_line = start_line
+        self.end_line = end_line
+        self.rules = rules
+        self.regions = regions or [[start_line, end_line]]
+
+    def to_dict(self):
+        return dict(self.__dict__)
+
+
+class Grammar(object):
+    """The rules and tag regions of a grammar.adoc file, each in the
+    order they appear in the file, by name, and its precedence
+    declarations, as parse_precedence() returns them."""
+
+    def __init__(self, rules, tags, precedence=None):
+        self.rules = rules
+        self.tags = tags
+        self.precedence = precedence or []
+
+    def rule_pairs(self):
+        """Return the rules in the form trim_rules() does."""
+        return [(r.name, r.alternatives) for r in self.rules.values()]
+
+    def terminals(self):
+        """Return a dict from each terminal the rules use, in the order
+        they are first used, to the names of the rules using it."""
+        terminals = {}
+        for rule in self.rules.values():
+            for alt in rule.alternatives:
+                for symbol in alternative_symbols(alt):
+                    if symbol not in self.rules:
+                        users = terminals.setdefault(symbol, [])
+                        if rule.name not in users:
+                            users.append(rule.name)
+        return terminals
+
+    def to_dict(self):
+        return {
+            'rules': [r.to_dict() for r in self.rules.values()],
+            'tags': [t.to_dict() for t in self.tags.values()],
+            'precedence': self.precedence,
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        rules = dict((r['name'], Rule(**r)) for r in d['rules'])
+        tags = dict((t['name'], TagRegion(**t)) for t in d['tags'])
+        return cls(rules, tags, [tuple(p) for p in d['precedence']])
+
+
+# Bison's precedence declarations, from lowest to highest precedence.
+# Tokens in single quotes are given in double quotes, as in the rules.
+
+precedence_re = re.compile(r"^%(left|right|nonassoc|precedence)\b(.*)$",
+                           re.MULTILINE)
+precedence_token_re = re.compile(r""""[^"]*"|'[^']*'|<[^>]*>|[A-Za-z_][\w.]*""")
+
+
+def parse_precedence(text):
+    """Return the precedence declarations of text, from the lowest
+    precedence to the highest, as (associativity, tokens) pairs."""
+    levels = []
+    for assoc, rest in precedence_re.findall(text):
+        rest = re.sub(r"//.*|/\*.*?\*/", "", rest)
+        tokens = []
+        for token in precedence_token_re.findall(rest):
+            if token.startswith('<'):
+                continue  # A semantic value type
+            if token.startswith("'"):
+                token = '"%s"' % token[1:-1]
+            tokens.append(token)
+        levels.append((assoc, tokens))
+    return levels
+
+
+def parse_grammar(text):
+    """Build the Grammar of the text of a grammar.adoc file.  A rule
+    starts with its non-terminal at the start of a line and ends with
+    the first line after it that starts with ';' after white space.
+    The alternatives of a non-terminal defined again are added to its
+    rule, and the regions of a tag used again to its TagRegion."""
+    rules = {}
+    tags = {}
+    precedence = []
+    open_tags = []
+    rule_lines = None
+    for number, line in enumerate(text.split('\n'), 1):
+        if rule_lines is not None:
+            rule_lines.append(line)
+            if line.lstrip().startswith(';'):
+                pairs = trim_rules('\n'.join(rule_lines))
+                if len(pairs) != 1:
+                    raise GrammarError("line %d: cannot parse rule %s"
+                                       % (first_line, name))
+                tag_names = []
+                for t, _ in open_tags:
+                    if t.name not in tag_names:
+                        tag_names.append(t.name)
+                if name in rules:
+                    rules[name].add_definition(pairs[0][1], first_line,
+                                               number, tag_names)
+                else:
+                    rules[name] = Rule(name, pairs[0][1], first_line, number,
+                                       tag_names)
+                for t, _ in open_tags:
+                    if name not in t.rules:
+                        t.rules.append(name)
+                rule_lines = None
+            continue
+        match = tag_re.match(line)
+        if match:
+            kind, tag = match.groups()
+            if kind == 'tag':
+                if tag in tags:
+                    region = [number, None]
+                    tags[tag].regions.append(region)
+                else:
+                    tags[tag] = TagRegion(tag, number, None, [])
+                    region = tags[tag].regions[0]
+                open_tags.append((tags[tag], region))
+            else:
+                if not open_tags or open_tags[-1][0].name != tag:
+                    raise GrammarError("line %d: end::%s[] does not match "
+                                       "an open tag" % (number, tag))
+                t, region = open_tags.pop()
+                region[1] = number
+                t.end_line = t.regions[0][1]
+            continue
+        match = precedence_re.match(line)
+        if match:
+            precedence.extend(parse_precedence(line))
+            continue
+        match = rule_start_re.match(line)
+        if match:
+            name = match.group(1)
+            first_line = number
+            rule_lines = [line]
+    if rule_lines is not None:
+        raise GrammarError("line %d: rule %s has no end" % (first_line, name))
+    if open_tags:
+        raise GrammarError("line %d: tag %s has no end"
+                           % (open_tags[-1][1][0], open_tags[-1][0].name))
+    return Grammar(rules, tags, precedence)
+
+
+# Cached models are kept in a directory build/grammar-cache next to the
+# grammar file, one JSON file per grammar file.  A cached model is used
+# if the grammar file has the same modification time and size as when
+# the model was made, or else if it has the same contents.  The hash of
+# this file is part of the key as well, so that a change to the parser
+# invalidates the models made by the old one.
+
+def cache_file_for(filename):
+    directory = os.path.join(os.path.dirname(os.path.abspath(filename)),
+                             'build', 'grammar-cache')
+    return os.path.join(directory, os.path.basename(filename) + '.json')
+
+
+def file_digest(data):
+    return hashlib.sha1(data).hexdigest()
+
+
+with open(os.path.abspath(__file__), 'rb') as script:
+    engine = file_digest(script.read())
+
+
+def load_grammar(filename, cache_file=None):
+    """Return the Grammar of a grammar.adoc file, from the cache if
+    possible.  The cache file defaults to cache_file_for(filename);
+    if it cannot be written, the model is still returned."""
+    if cache_file is None:
+        cache_file = cache_file_for(filename)
+    stat = os.stat(filename)
+    cached = None
+    try:
+        with open(cache_file, 'r') as infile:
+            cached = json.load(infile)
+    except (OSError, ValueError):
+        pass
+    if cached is not None and cached.get('engine') == engine:
+        if (cached['mtime_ns'] == stat.st_mtime_ns and
+                cached['size'] == stat.st_size):
+            return Grammar.from_dict(cached['grammar'])
+    with open(filename, 'rb') as infile:
+        data = infile.read()
+    digest = file_digest(data)
+    if (cached is not None and cached.get('engine') == engine and
+            cached['sha1'] == digest):
+        grammar = Grammar.from_dict(cached['grammar'])
+    else:
+        grammar = parse_grammar(data.decode('utf-8'))
+    cached = {
+        'engine': engine,
+        'mtime_ns': stat.st_mtime_ns,
+        'size': stat.st_size,
+        'sha1': digest,
+        'grammar': grammar.to_dict(),
+    }
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        with open(cache_file + '.tmp', 'w') as outfile:
+            json.dump(cached, outfile)
+        os.replace(cache_file + '.tmp', cache_file)
+    except OSError:
+        pass
+    return grammar
+
+
+def read_rules(filename):
+    """Return the trimmed rules of a grammar file, using the cached
+    model for an AsciiDoc file."""
+    if filename.endswith('.adoc'):
+        return load_grammar(filename).rule_pairs()
+    return trim_rules(read_grammar(filename))
+
+
+def read_precedence(filename):
+    """Return the precedence declarations of a grammar file, using the
+    cached model for an AsciiDoc file.  The output of
+    trim-p4-grammar-file.py has none."""
+    if filename.endswith('.adoc'):
+        return load_grammar(filename).precedence
+    with open(filename) as infile:
+        return parse_precedence(infile.read())
+
+
+if __name__ == '__main__':
+    # Print the model of a grammar.adoc file as JSON
+    if len(sys.argv) != 2:
+        sys.exit("usage: %s grammar.adoc" % (sys.argv[0]))
+    json.dump(load_grammar(sys.argv[1]).to_dict(), sys.stdout, indent=2)
+    print()
@@ -0,0 +1,232 @@
+# SPDX-FileCopyrightText: 2026 The P4 Language Consortium
+#
+# SPDX-License-Identifier: Apache-2.0
+
+# The dependency graph of the non-terminals of a grammar, as
+# p4grammar reads it: A depends on B if an alternative of A uses B, and
+# B is a left corner of A if an alternative of A can start with B,
+# after non-terminals that derive the empty string.  The strongly
+# connected components are found with Tarjan's algorithm, and what
+# each non-terminal reaches, directly or not, is kept as an int used as
+# a bitset, with bit i for non-terminal number i, so that questions
+# such as whether A depends on B are a bit test.
+
+import collections
+
+import p4grammar
+
+
+class GrammarGraph(object):
+    """The dependency graph of rules, as trim_rules() gives them, with
+    start (by default, the first rule) as the root."""
+
+    def __init__(self, rules, start=None):
+        merged = collections.OrderedDict()
+        for name, alts in rules:
+            merged.setdefault(name, []).extend(alts)
+        self.names = list(merged)
+        self.index = dict((name, i) for i, name in enumerate(self.names))
+        if not self.names:
+            raise p4grammar.GrammarError("the grammar has no rules")
+        if start is None:
+            start = self.names[0]
+        if start not in self.index:
+            raise p4grammar.GrammarError("no rule %s" % (start))
+        self.start = self.index[start]
+
+        alternatives = [[[self.index.get(s, -1)
+                          for s in p4grammar.alternative_symbols(alt)]
+                         for alt in merged[name]]
+                        for name in self.names]
+        self.nullable = p4grammar.nullable_rules(alternatives)
+        height, _ = p4grammar.min_derivations(alternatives)
+        self.productive = [h != float('inf') for h in height]
+
+        # Adjacency lists, without duplicates, in the order of first use
+        n = len(self.names)
+        self.uses = [[] for _ in range(n)]
+        self.left = [[] for _ in range(n)]
+        self.used_by = [[] for _ in range(n)]
+        for i, alts in enumerate(alternatives):
+            for alt in alts:
+                leading = True
+                for s in alt:
+                    if s < 0:
+                        leading = False
+                        continue
+                    if s not in self.uses[i]:
+                        self.uses[i].append(s)
+                        self.used_by[s].append(i)
+                    if leading and s not in self.left[i]:
+                        self.left[i].append(s)
+                    leading = leading and self.nullable[s]
+
+        self.components, self.component_of = strongly_connected(self.uses)
+        self.reach = closure(self.uses, self.components, self.component_of)
+        self.reached_by = transpose(self.reach)
+        left_components, left_component_of = strongly_connected(self.left)
+        self.left_reach = closure(self.left, left_components,
+                                  left_component_of)
+
+    # Queries, by name
+
+    def names_of(self, bitset):
+        return [self.names[i] for i in p4grammar.bits(bitset)]
+
+    def depends_on(self, a, b):
+        """Whether a uses b, directly or not."""
+        return bool(self.reach[self.index[a]] >> self.index[b] & 1)
+
+    def dependencies(self, name):
+        """The non-terminals name uses, directly or not."""
+        return self.names_of(self.reach[self.index[name]])
+
+    def dependents(self, name):
+        """The non-terminals that use name, directly or not."""
+        return self.names_of(self.reached_by[self.index[name]])
+
+    def path(self, a, b):
+        """A shortest list of non-terminals from a to b, each using the
+        next, or None if a does not depend on b."""
+        source, target = self.index[a], self.index[b]
+        if not self.reach[source] >> target & 1:
+            return None
+        previous = {source: None}
+        queue = collections.deque([source])
+        while queue:
+            i = queue.popleft()
+            for j in self.uses[i]:
+                if j == target:
+                    result = [self.names[j]]
+                    while i is not None:
+                        result.append(self.names[i])
+                        i = previous[i]
+                    return result[::-1]
+                if j not in previous:
+                    previous[j] = i
+                    queue.append(j)
+
+    def unreachable(self):
+        """The non-terminals the start symbol does not use."""
+        reached = self.reach[self.start] | (1 << self.start)
+        return [name for i, name in enumerate(self.names)
+                if not reached >> i & 1]
+
+    def unproductive(self):
+        """The non-terminals that derive no string of terminals."""
+        return [name for i, name in enumerate(self.names)
+                if not self.productive[i]]
+
+    def cycles(self):
+        """The strongly connected components with a cycle, each as a
+        list of names, largest first."""
+        cycles = [c for c in self.components
+                  if len(c) > 1 or self.reach[c[0]] >> c[0] & 1]
+        cycles.sort(key=lambda c: (-len(c), min(c)))
+        return [[self.names[i] for i in sorted(c)] for c in cycles]
+
+    def left_recursive(self):
+        """The non-terminals that are their own left corners, directly
+        or not."""
+        return [name for i, name in enumerate(self.names)
+                if self.left_reach[i] >> i & 1]
+
+    def to_dict(self):
+        """The graph and its closures, with sets as lists of names."""
+        return {
+            'start': self.names[self.start],
+            'rules': dict((name, {
+                'uses': [self.names[j] for j in self.uses[i]],
+                'used_by': [self.names[j] for j in self.used_by[i]],
+                'depends_on': self.names_of(self.reach[i]),
+                'nullable': self.nullable[i],
+            }) for i, name in enumerate(self.names)),
+            'unreachable': self.unreachable(),
+            'unproductive': self.unproductive(),
+            'cycles': self.cycles(),
+            'left_recursive': self.left_recursive(),
+        }
+
+
+def strongly_connected(edges):
+    """Return the strongly connected components of a graph given as
+    lists of successors, by Tarjan's algorithm, as lists of nodes, with
+    each component after every component it reaches, and a list of the
+    component number of each node."""
+    n = len(edges)
+    number = [0] * n
+    low = [0] * n
+    on_stack = [False] * n
+    stack = []
+    components = []
+    component_of = [0] * n
+    counter = 1
+    for root in range(n):
+        if number[root]:
+            continue
+        number[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        work = [(root, iter(edges[root]))]
+        while work:
+            v, successors = work[-1]
+            for w in successors:
+                if not number[w]:
+                    number[w] = low[w] = counter
+                    counter += 1
+                    stack.append(w)
+                    on_stack[w] = True
+                    work.append((w, iter(edges[w])))
+                    break
+                if on_stack[w] and number[w] < low[v]:
+                    low[v] = number[w]
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    if low[v] < low[parent]:
+                        low[parent] = low[v]
+                if low[v] == number[v]:
+                    component = []
+                    while True:
+                        w = stack.pop()
+                        on_stack[w] = False
+                        component_of[w] = len(components)
+                        component.append(w)
+                        if w == v:
+                            break
+                    components.append(component)
+    return components, component_of
+
+
+def closure(edges, components, component_of):
+    """Return the bitset of the nodes each node reaches in one step or
+    more, computed once per component, in the order Tarjan's algorithm
+    finds them, so that the components a component reaches are done
+    before it."""
+    reach = [0] * len(edges)
+    for c, component in enumerate(components):
+        result = 0
+        cyclic = len(component) > 1
+        for v in component:
+            for w in edges[v]:
+                if component_of[w] == c:
+                    cyclic = True
+                else:
+                    result |= reach[w] | (1 << w)
+        if cyclic:
+            for v in component:
+                result |= 1 << v
+        for v in component:
+            reach[v] = result
+    return reach
+
+
+def transpose(reach):
+    """Return, for each node, the bitset of the nodes that reach it."""
+    reached_by = [0] * len(reach)
+    for v, bitset in enumerate(reach):
+        for w in p4grammar.bits(bitset):
+            reached_by[w] |= 1 << v
+    return reached_by
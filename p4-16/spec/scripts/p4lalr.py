@@ -0,0 +1,548 @@
+# SPDX-FileCopyrightText: 2026 The P4 Language Consortium
+#
+# SPDX-License-Identifier: Apache-2.0
+
+# LALR(1) analysis of the grammars p4grammar reads: the nullable
+# non-terminals and the FIRST and FOLLOW sets, the LR(0) automaton,
+# LALR(1) lookaheads computed as DeRemer and Pennello do, and the
+# conflicts of the resulting parse tables, after resolving those that
+# the precedence declarations resolve, as Bison does.
+#
+# Sets of terminals are ints used as bitsets, with bit i for terminal
+# number i, so that the fixpoints and unions are done on whole sets at
+# once.
+
+import hashlib
+import json
+import os
+
+import p4grammar
+
+end_marker = '$end'
+accept_name = '$accept'
+
+
+class Production(object):
+    """A production lhs -> rhs, numbered number, with lhs a non-terminal
+    number and rhs a tuple of symbol numbers, and its precedence level
+    (0 if it has none)."""
+
+    def __init__(self, number, lhs, rhs, prec):
+        self.number = number
+        self.lhs = lhs
+        self.rhs = rhs
+        self.prec = prec
+
+
+class Analysis(object):
+    """The sets, automaton and conflicts of a grammar given as
+    (non-terminal, alternatives) pairs, with its precedence
+    declarations.  Terminals are numbered from 0, with 0 for the end
+    of the input, and non-terminals from len(self.terminals); the
+    first non-terminal of the rules is the start symbol."""
+
+    def __init__(self, rules, precedence=()):
+        self.read_rules(rules, precedence)
+        self.compute_sets()
+        self.build_lr0()
+        self.compute_lookaheads()
+        self.build_tables()
+
+    # Symbols and productions
+
+    def read_rules(self, rules, precedence):
+        nonterminals = [accept_name]
+        alternatives = {}
+        for name, alts in rules:
+            if name not in alternatives:
+                nonterminals.append(name)
+                alternatives[name] = []
+            alternatives[name].extend(alts)
+        if len(nonterminals) < 2:
+            raise p4grammar.GrammarError("the grammar has no rules")
+        terminals = [end_marker]
+        seen = set(terminals)
+        parsed = {}
+        for name in nonterminals[1:]:
+            parsed[name] = []
+            for alt in alternatives[name]:
+                symbols = p4grammar.alternative_symbols(alt)
+                match = p4grammar.prec_re.search(alt)
+                prec_token = match.group(0).split()[1] if match else None
+                parsed[name].append((symbols, prec_token))
+                for symbol in symbols:
+                    if symbol not in alternatives and symbol not in seen:
+                        seen.add(symbol)
+                        terminals.append(symbol)
+        self.terminals = terminals
+        self.nonterminals = nonterminals
+        self.names = terminals + nonterminals
+        number = dict((name, i) for i, name in enumerate(self.names))
+        nt_base = len(terminals)
+        self.nt_base = nt_base
+
+        # The precedence level of each token, counting from 1, and its
+        # associativity
+        self.token_prec = {}
+        self.token_assoc = {}
+        for level, (assoc, tokens) in enumerate(precedence, 1):
+            for token in tokens:
+                self.token_prec[token] = level
+                self.token_assoc[token] = assoc
+
+        start = nt_base + 1
+        self.productions = [Production(0, nt_base, (start, 0), 0)]
+        for name in nonterminals[1:]:
+            for symbols, prec_token in parsed[name]:
+                rhs = tuple(number[s] for s in symbols)
+                if prec_token is not None:
+                    prec = self.token_prec.get(prec_token, 0)
+                else:
+                    # The precedence of the last terminal that has one
+                    prec = 0
+                    for s in reversed(symbols):
+                        if s not in alternatives:
+                            prec = self.token_prec.get(s, 0)
+                            break
+                self.productions.append(Production(
+                    len(self.productions), number[name], rhs, prec))
+        self.prods_of = [[] for _ in nonterminals]
+        for p in self.productions:
+            self.prods_of[p.lhs - nt_base].append(p.number)
+
+    def is_terminal(self, symbol):
+        return symbol < self.nt_base
+
+    # Nullable, FIRST and FOLLOW
+
+    def compute_sets(self):
+        nt_base = self.nt_base
+        n = len(self.nonterminals)
+        nullable = p4grammar.nullable_rules(
+            [[[s - nt_base if s >= nt_base else -1
+               for s in self.productions[p].rhs] for p in prods]
+             for prods in self.prods_of])
+        self.nullable = nullable
+
+        first = [0] * n
+        changed = True
+        while changed:
+            changed = False
+            for p in self.productions:
+                i = p.lhs - nt_base
+                new = first[i]
+                for s in p.rhs:
+                    if s < nt_base:
+                        new |= 1 << s
+                        break
+                    new |= first[s - nt_base]
+                    if not nullable[s - nt_base]:
+                        break
+                if new != first[i]:
+                    first[i] = new
+                    changed = True
+        self.first = first
+
+        follow = [0] * n
+        follow[1] = 1  # The end of the input follows the start symbol
+        changed = True
+        while changed:
+            changed = False
+            for p in self.productions:
+                # Walk the right side backwards, keeping what can follow
+                # the current position
+                trailer = follow[p.lhs - nt_base]
+                for s in reversed(p.rhs):
+                    if s < nt_base:
+                        trailer = 1 << s
+                        continue
+                    i = s - nt_base
+                    if trailer & ~follow[i]:
+                        follow[i] |= trailer
+                        changed = True
+                    if nullable[i]:
+                        trailer |= first[i]
+                    else:
+                        trailer = first[i]
+        self.follow = follow
+
+    def first_of(self, symbols):
+        """Return the FIRST set of a sequence of symbols, and whether
+        it can derive the empty string."""
+        result = 0
+        for s in symbols:
+            if s < self.nt_base:
+                return result | (1 << s), False
+            result |= self.first[s - self.nt_base]
+            if not self.nullable[s - self.nt_base]:
+                return result, False
+        return result, True
+
+    # The LR(0) automaton.  An item is a number: the number of the
+    # first item of its production plus the position of its dot.
+
+    def build_lr0(self):
+        nt_base = self.nt_base
+        n = len(self.nonterminals)
+        item_base = []
+        item_prod = []
+        item_next = []
+        for p in self.productions:
+            item_base.append(len(item_prod))
+            for dot in range(len(p.rhs) + 1):
+                item_prod.append(p.number)
+                item_next.append(p.rhs[dot] if dot < len(p.rhs) else -1)
+        self.item_base = item_base
+        self.item_prod = item_prod
+        self.item_next = item_next
+
+        # The non-terminals whose productions are added to a closure
+        # because of each non-terminal after a dot: itself, and the
+        # first symbols of their productions, transitively
+        corner = [1 << i for i in range(n)]
+        changed = True
+        while changed:
+            changed = False
+            for p in self.productions:
+                if p.rhs and p.rhs[0] >= nt_base:
+                    i = p.lhs - nt_base
+                    new = corner[i] | corner[p.rhs[0] - nt_base]
+                    if new != corner[i]:
+                        corner[i] = new
+                        changed = True
+        start_items = [[item_base[p] for p in self.prods_of[i]]
+                       for i in range(n)]
+
+        states = []
+        kernels = {}
+        transitions = []
+
+        def state_of(kernel):
+            state = kernels.get(kernel)
+            if state is None:
+                state = len(states)
+                kernels[kernel] = state
+                states.append(kernel)
+                transitions.append(None)
+            return state
+
+        state_of((item_base[0],))
+        done = 0
+        while done < len(states):
+            kernel = states[done]
+            closure_nts = 0
+            for item in kernel:
+                s = item_next[item]
+                if s >= nt_base:
+                    closure_nts |= corner[s - nt_base]
+            items = list(kernel)
+            for i in p4grammar.bits(closure_nts):
+                items.extend(start_items[i])
+            goto_items = {}
+            for item in items:
+                s = item_next[item]
+                if s >= 0:
+                    goto_items.setdefault(s, []).append(item + 1)
+            transitions[done] = dict(
+                (s, state_of(tuple(sorted(targets))))
+                for s, targets in goto_items.items())
+            done += 1
+        self.kernels = states
+        self.transitions = transitions
+        self.corner = corner
+        self.start_items = start_items
+
+    def closure(self, state):
+        """Return the items of a state, its kernel first."""
+        kernel = self.kernels[state]
+        closure_nts = 0
+        for item in kernel:
+            s = self.item_next[item]
+            if s >= self.nt_base:
+                closure_nts |= self.corner[s - self.nt_base]
+        items = list(kernel)
+        for i in p4grammar.bits(closure_nts):
+            items.extend(self.start_items[i])
+        return items
+
+    def reductions(self, state):
+        """Return the productions a state can reduce by."""
+        prods = []
+        for item in self.closure(state):
+            if self.item_next[item] == -1:
+                prods.append(self.item_prod[item])
+        return prods
+
+    # LALR(1) lookaheads, by DeRemer and Pennello's method
+
+    def compute_lookaheads(self):
+        nt_base = self.nt_base
+        transitions = self.transitions
+        nullable = self.nullable
+        nt_trans = []
+        nt_index = {}
+        for state, trans in enumerate(transitions):
+            for s, target in trans.items():
+                if s >= nt_base:
+                    nt_index[state, s] = len(nt_trans)
+                    nt_trans.append((state, s))
+
+        direct = []
+        reads = []
+        for state, s in nt_trans:
+            target = transitions[state][s]
+            dr = 0
+            rd = []
+            for t in transitions[target]:
+                if t < nt_base:
+                    dr |= 1 << t
+                elif nullable[t - nt_base]:
+                    rd.append(nt_index[target, t])
+            direct.append(dr)
+            reads.append(rd)
+        read = digraph(reads, direct)
+
+        includes = [[] for _ in nt_trans]
+        lookback = {}
+        for j, (state, lhs) in enumerate(nt_trans):
+            for p in self.prods_of[lhs - nt_base]:
+                rhs = self.productions[p].rhs
+                # nullable_after[k] is whether rhs[k:] can derive the
+                # empty string
+                nullable_after = [True] * (len(rhs) + 1)
+                for k in range(len(rhs) - 1, -1, -1):
+                    s = rhs[k]
+                    nullable_after[k] = (nullable_after[k + 1] and
+                                         s >= nt_base and
+                                         nullable[s - nt_base])
+                current = state
+                for k, s in enumerate(rhs):
+                    if s >= nt_base and nullable_after[k + 1]:
+                        includes[nt_index[current, s]].append(j)
+                    current = transitions[current][s]
+                lookback.setdefault((current, p), []).append(j)
+        follow = digraph(includes, read)
+
+        lookaheads = {}
+        for key, js in lookback.items():
+            la = 0
+            for j in js:
+                la |= follow[j]
+            lookaheads[key] = la
+        self.lookaheads = lookaheads
+
+    # The parse tables and their conflicts
+
+    def build_tables(self):
+        nt_base = self.nt_base
+        self.actions = []
+        self.conflicts = []
+        accept_item = self.item_base[0] + 2
+        for state, trans in enumerate(self.transitions):
+            actions = {}
+            for s, target in trans.items():
+                if s < nt_base:
+                    actions[s] = ('shift', target)
+            if accept_item in self.kernels[state]:
+                actions[0] = ('accept', 0)
+            reduce_on = {}
+            for p in self.reductions(state):
+                if p == 0:
+                    continue
+                for t in p4grammar.bits(self.lookaheads.get((state, p), 0)):
+                    reduce_on.setdefault(t, []).append(p)
+            for t, prods in sorted(reduce_on.items()):
+                self.resolve(state, t, actions, prods)
+            self.actions.append(actions)
+
+    def resolve(self, state, t, actions, prods):
+        """Set the action of state on terminal t, given the productions
+        it can reduce by on t, and record any conflict."""
+        prods = sorted(prods)
+        shift = actions.get(t)
+        if shift is not None:
+            token = self.terminals[t]
+            token_prec = self.token_prec.get(token, 0)
+            unresolved = []
+            for p in prods:
+                prec = self.productions[p].prec
+                if not prec or not token_prec:
+                    unresolved.append(p)
+                elif prec > token_prec:
+                    shift = None
+                    break
+                elif prec < token_prec:
+                    prods = [q for q in prods if q != p]
+                else:
+                    assoc = self.token_assoc[token]
+                    if assoc == 'left':
+                        shift = None
+                        break
+                    prods = [q for q in prods if q != p]
+                    if assoc == 'nonassoc':
+                        shift = ('error', 0)
+            if shift is not None:
+                if unresolved and shift[0] == 'shift':
+                    self.conflicts.append({
+                        'state': state, 'kind': 'shift/reduce',
+                        'token': token, 'productions': unresolved})
+                actions[t] = shift
+                return
+        if len(prods) > 1:
+            self.conflicts.append({
+                'state': state, 'kind': 'reduce/reduce',
+                'token': self.terminals[t], 'productions': prods})
+        if prods:
+            actions[t] = ('reduce', prods[0])
+
+    # Reporting
+
+    def counts(self):
+        """Return the numbers of shift/reduce and reduce/reduce
+        conflicts."""
+        sr = sum(1 for c in self.conflicts if c['kind'] == 'shift/reduce')
+        return sr, len(self.conflicts) - sr
+
+    def format_production(self, p, dot=None):
+        prod = self.productions[p]
+        symbols = [self.names[s] for s in prod.rhs]
+        if p == 0:
+            symbols = symbols[:1]
+        if dot is not None:
+            symbols.insert(dot, '.')
+        return '%s: %s' % (self.names[prod.lhs], ' '.join(symbols))
+
+    def format_item(self, item):
+        p = self.item_prod[item]
+        return self.format_production(p, item - self.item_base[p])
+
+    def shift_items(self, state, token):
+        """Return the items of state with token after the dot."""
+        t = self.terminals.index(token)
+        return [self.format_item(item) for item in self.closure(state)
+                if self.item_next[item] == t]
+
+    def set_names(self, bitset):
+        return [self.terminals[t] for t in p4grammar.bits(bitset)]
+
+    def to_dict(self):
+        """Return the sets, tables and conflicts, with symbols by name,
+        for caching and for other tools."""
+        nts = self.nonterminals
+        nt_base = self.nt_base
+
+        def action_text(action):
+            kind, value = action
+            return {'shift': 's%d', 'reduce': 'r%d', 'accept': 'acc',
+                    'error': 'err'}[kind].replace('%d', str(value))
+
+        return {
+            'terminals': self.terminals,
+            'nonterminals': nts,
+            'productions': [self.format_production(p.number)
+                            for p in self.productions],
+            'nullable': [nts[i] for i in range(len(nts))
+                         if self.nullable[i]],
+            'first': dict((nts[i], self.set_names(self.first[i]))
+                          for i in range(len(nts))),
+            'follow': dict((nts[i], self.set_names(self.follow[i]))
+                           for i in range(len(nts))),
+            'action': [dict((self.terminals[t], action_text(a))
+                            for t, a in sorted(actions.items()))
+                       for actions in self.actions],
+            'goto': [dict((self.names[s], target)
+                          for s, target in sorted(trans.items())
+                          if s >= nt_base)
+                     for trans in self.transitions],
+            'conflicts': [dict(c, items=self.shift_items(c['state'],
+                                                         c['token'])
+                               if c['kind'] == 'shift/reduce' else [],
+                               productions=[self.format_production(p)
+                                            for p in c['productions']])
+                          for c in self.conflicts],
+        }
+
+
+def digraph(edges, initial):
+    """Return, for each node x of a graph given as lists of successors,
+    the union of the initial sets of the nodes reachable from x,
+    including x itself, with the nodes of each strongly connected
+    component sharing one set (DeRemer and Pennello's algorithm)."""
+    n = len(edges)
+    result = list(initial)
+    depth = [0] * n
+    stack = []
+    infinity = n + 1
+    for root in range(n):
+        if depth[root]:
+            continue
+        stack.append(root)
+        depth[root] = len(stack)
+        work = [(root, iter(edges[root]))]
+        while work:
+            x, successors = work[-1]
+            for y in successors:
+                if depth[y] == 0:
+                    stack.append(y)
+                    depth[y] = len(stack)
+                    work.append((y, iter(edges[y])))
+                    break
+                if depth[y] < depth[x]:
+                    depth[x] = depth[y]
+                result[x] |= result[y]
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    if depth[x] < depth[parent]:
+                        depth[parent] = depth[x]
+                    result[parent] |= result[x]
+                if depth[x] == stack.index(x) + 1:
+                    while True:
+                        top = stack.pop()
+                        depth[top] = infinity
+                        result[top] = result[x]
+                        if top == x:
+                            break
+    return result
+
+
+# Analyses are cached in the grammar cache directory of p4grammar, in
+# <grammar file>.lalr.json, keyed on a hash of the rules, the
+# precedence declarations, this file and p4grammar.py, whose fixpoints
+# it uses.
+
+with open(os.path.abspath(__file__), 'rb') as script:
+    engine = hashlib.sha1(script.read()).hexdigest()
+
+
+def grammar_digest(rules, precedence):
+    text = json.dumps([rules, precedence], sort_keys=True)
+    key = engine + p4grammar.engine + text
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def load_analysis(filename, rules, precedence, use_cache=True):
+    """Return the analysis of rules and precedence, read from
+    filename, as Analysis.to_dict() does, from the cache if
+    possible."""
+    digest = grammar_digest(rules, precedence)
+    cache_file = p4grammar.cache_file_for(filename)[:-len('.json')] + \
+        '.lalr.json'
+    if use_cache:
+        try:
+            with open(cache_file) as infile:
+                cached = json.load(infile)
+            if cached.get('digest') == digest:
+                return cached['analysis']
+        except (OSError, ValueError):
+            pass
+    analysis = Analysis(rules, precedence).to_dict()
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        with open(cache_file + '.tmp', 'w') as outfile:
+            json.dump({'digest': digest, 'analysis': analysis}, outfile)
+        os.replace(cache_file + '.tmp', cache_file)
+    except OSError:
+        pass
+    return analysis
@@ -4,10 +4,222 @@
 #
 # SPDX-License-Identifier: Apache-2.0
 
-import fileinput
+import argparse
+import os
 import re
+import sys
+import time
 
-for line in fileinput.input():
-    match = re.match(r"^// (tag|end)::", line)
-    if not match:
-        print(line, end='')
+parser = argparse.ArgumentParser(description="""
+Copy AsciiDoc files, such as grammar.adoc, removing the '// tag::' and
+'// end::' comment lines that mark the regions included elsewhere.
+With no files, read standard input.  Optionally, also write the lines
+of each tagged region to a file of its own, so that documents can
+include the region directly instead of having asciidoctor look for the
+tag in the whole file each time.
+""")
+parser.add_argument('files', metavar='file', nargs='*')
+parser.add_argument('-o', '--output',
+                    help='file to write instead of standard output')
+parser.add_argument('--suffix',
+                    help='instead of copying all the files to one output, '
+                    'copy each file to one of its own, named by adding '
+                    'SUFFIX before its extension (e.g. .trimmed)')
+parser.add_argument('--split-tags', metavar='DIR',
+                    help='also write the lines of each tagged region, '
+                    'without any tag comment lines, to DIR/<tag>.adoc')
+parser.add_argument('--watch', action='store_true',
+                    help='keep running, and regenerate the output whenever '
+                    'one of the files changes')
+
+# A tag comment line: its kind, and the name of its tag
+tag_line_re = re.compile(rb"^// (tag|end)::([^\[\n]*)[^\n]*\n?", re.MULTILINE)
+
+# Inputs are read in blocks of about this many bytes, cut at the end of
+# a line
+block_size = 1 << 20
+
+
+def read_blocks(infile):
+    carry = b''
+    while True:
+        block = infile.read(block_size)
+        if not block:
+            break
+        block = carry + block
+        cut = block.rfind(b'\n') + 1
+        carry = block[cut:]
+        if cut:
+            yield block[:cut]
+    if carry:
+        yield carry
+
+
+class Trimmer(object):
+    """
+    Filters the tag comment lines out of blocks of whole lines, and
+    writes the rest to outfile, a binary file.  With regions a dict,
+    also collects the lines of each tagged region in it, by tag.  As
+    asciidoctor does for includes, the lines of the regions of a tag
+    used more than once are collected one after another.
+    """
+
+    def __init__(self, outfile, regions=None):
+        self.outfile = outfile
+        self.regions = regions
+        # The tags open at the current line, innermost last
+        self.open_tags = []
+
+    def feed(self, block):
+        """
+        Filter block
+        """
+        if self.regions is None:
+            self.outfile.write(tag_line_re.sub(b'', block))
+            return
+        pieces = []
+        pos = 0
+        for match in tag_line_re.finditer(block):
+            self.add_text(pieces, block[pos:match.start()])
+            pos = match.end()
+            kind, tag = match.groups()
+            tag = tag.decode('utf-8')
+            if kind == b'tag':
+                self.regions.setdefault(tag, [])
+                self.open_tags.append(tag)
+            elif tag in self.open_tags:
+                del self.open_tags[len(self.open_tags) - 1 -
+                                   self.open_tags[::-1].index(tag)]
+        self.add_text(pieces, block[pos:])
+        self.outfile.write(b''.join(pieces))
+
+    def add_text(self, pieces, text):
+        if text:
+            pieces.append(text)
+            # A tag open within itself still collects the text once
+            for tag in set(self.open_tags):
+                self.regions[tag].append(text)
+
+
+def trim(fnames, outfile, tag_dir=None):
+    """
+    Write the files, or standard input if there are none, to outfile,
+    a binary file, without the tag comment lines
+    """
+    trimmer = Trimmer(outfile, None if tag_dir is None else {})
+    for fname in fnames or ['-']:
+        if fname == '-':
+            trim_file(trimmer, sys.stdin.buffer)
+        else:
+            with open(fname, 'rb') as infile:
+                trim_file(trimmer, infile)
+    if tag_dir is not None:
+        write_regions(trimmer.regions, tag_dir)
+
+
+def trim_file(trimmer, infile):
+    for block in read_blocks(infile):
+        trimmer.feed(block)
+
+
+def write_regions(regions, tag_dir):
+    """
+    Write each region to tag_dir/<tag>.adoc, leaving the files that
+    have not changed alone, and remove the files of tags that are gone.
+    The modification time of tag_dir is then that of the last update,
+    which is how tools/grammar-tags.rb knows that the files are up to
+    date.
+    """
+    os.makedirs(tag_dir, exist_ok=True)
+    for tag, region in regions.items():
+        data = b''.join(region)
+        fname = os.path.join(tag_dir, tag + '.adoc')
+        try:
+            with open(fname, 'rb') as infile:
+                if infile.read() == data:
+                    continue
+        except OSError:
+            pass
+        write_file(fname, data)
+    for fname in os.listdir(tag_dir):
+        if fname.endswith('.adoc') and fname[:-len('.adoc')] not in regions:
+            os.remove(os.path.join(tag_dir, fname))
+    os.utime(tag_dir)
+
+
+def write_file(fname, data):
+    # Write to a temporary file first, so that a build reading the
+    # file never sees it half written.
+    with open(fname + '.tmp', 'wb') as outfile:
+        outfile.write(data)
+    os.replace(fname + '.tmp', fname)
+
+
+def trim_to_file(fnames, output, tag_dir=None):
+    # Write to a temporary file first, so that a build reading the
+    # output never sees it half written.
+    try:
+        with open(output + '.tmp', 'wb') as outfile:
+            trim(fnames, outfile, tag_dir)
+    except BaseException:
+        os.remove(output + '.tmp')
+        raise
+    os.replace(output + '.tmp', output)
+
+
+def suffixed(fname, suffix):
+    """
+    Return the name of the trimmed copy of fname, e.g. grammar.trimmed.adoc
+    for grammar.adoc with suffix .trimmed
+    """
+    root, ext = os.path.splitext(fname)
+    return root + suffix + ext
+
+
+def trim_each(fnames, suffix):
+    for fname in fnames:
+        trim_to_file([fname], suffixed(fname, suffix))
+
+
+# Poll the files, and regenerate the output whenever one of them
+# changes, without paying for a new Python process each time.
+def watch(fnames, output, tag_dir=None, interval=0.05):
+    stamps = None
+    while True:
+        try:
+            current = [(os.stat(f).st_mtime_ns, os.stat(f).st_size)
+                       for f in fnames]
+        except OSError:  # A file is being replaced; try again
+            current = stamps
+        if current != stamps:
+            stamps = current
+            start = time.time()
+            trim_to_file(fnames, output, tag_dir)
+            print("%s: wrote %s in %.1f ms"
+                  % (parser.prog, output, (time.time() - start) * 1000),
+                  file=sys.stderr)
+        time.sleep(interval)
+
+
+def main():
+    args = parser.parse_args()
+    if args.suffix is not None:
+        if not args.files or args.output or args.split_tags or args.watch:
+            parser.error("--suffix needs files, and cannot be used with "
+                         "--output, --split-tags or --watch")
+        trim_each(args.files, args.suffix)
+    elif args.watch:
+        if not args.files or not args.output:
+            parser.error("--watch needs files and --output")
+        try:
+            watch(args.files, args.output, args.split_tags)
+        except KeyboardInterrupt:
+            pass
+    elif args.output:
+        trim_to_file(args.files, args.output, args.split_tags)
+    else:
+        trim(args.files, sys.stdout.buffer, args.split_tags)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,311 @@
+# SPDX-FileCopyrightText: 2026 The P4 Language Consortium
+#
+# SPDX-License-Identifier: Apache-2.0
+
+# Indexing the regions of a file marked with AsciiDoc tag directives,
+# e.g. '// tag::name[]' and '// end::name[]', and the include
+# directives of AsciiDoc files that select such regions by tag.
+#
+# Files are scanned as bytes, through mmap, and each region is
+# recorded by the byte offsets of its first line and of the end of its
+# last line, so that other tools can read a region by slicing the file
+# instead of scanning it again.
+
+import mmap
+import os
+import re
+
+# These follow the directives as asciidoctor recognizes them
+tag_directive_re = re.compile(rb"\b(tag|end)::(\S+?)\[\](?=$|[ \r])",
+                              re.MULTILINE)
+include_re = re.compile(rb"^include::([^\[\s]+)\[([^\]\n]*)\]", re.MULTILINE)
+tag_attribute_re = re.compile(r"\btags?=([^,]*)")
+
+
+class Region(object):
+    """
+    A tagged region: its contents are the bytes [start, end) of the
+    file, and its tag and end directives are on lines line and
+    end_line (counting from 1)
+    """
+
+    def __init__(self, tag, start, line):
+        self.tag = tag
+        self.start = start
+        self.line = line
+        self.end = None
+        self.end_line = None
+
+    def to_dict(self):
+        return {'start': self.start, 'end': self.end,
+                'line': self.line, 'end_line': self.end_line}
+
+
+def map_file(fname):
+    """
+    Return the contents of fname as an mmap, or as bytes if it is
+    empty (which cannot be mapped)
+    """
+    with open(fname, 'rb') as infile:
+        if os.fstat(infile.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class LineCounter(object):
+    """
+    Returns the line number of increasing offsets into data
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.offset = 0
+        self.line = 1
+
+    def line_at(self, offset):
+        # An mmap has no count(), but its slices are bytes
+        self.line += self.data[self.offset:offset].count(b'\n')
+        self.offset = offset
+        return self.line
+
+
+class TagIndex(object):
+    """
+    The tagged regions of a file, as a list for each tag, and the
+    problems found with its tag directives, as (line, message) pairs.
+    Tags used more than once, which are not a problem, are listed in
+    repeated the same way.
+    """
+
+    def __init__(self, fname):
+        self.fname = fname
+        self.regions = {}
+        self.problems = []
+        self.repeated = []
+
+    @classmethod
+    def scan(cls, fname):
+        index = cls(fname)
+        data = map_file(fname)
+        try:
+            index.scan_data(data)
+        finally:
+            if isinstance(data, mmap.mmap):
+                data.close()
+        return index
+
+    def scan_data(self, data):
+        lines = LineCounter(data)
+        open_regions = []
+        for match in tag_directive_re.finditer(data):
+            kind, tag = match.groups()
+            tag = tag.decode('utf-8')
+            line = lines.line_at(match.start())
+            if kind == b'tag':
+                # As for asciidoctor, a tag may mark several regions,
+                # which are included one after another
+                regions = self.regions.setdefault(tag, [])
+                if regions:
+                    self.repeated.append(
+                        (line, "tag %s is also used on line %d"
+                         % (tag, regions[0].line)))
+                end_of_line = data.find(b'\n', match.end())
+                start = len(data) if end_of_line < 0 else end_of_line + 1
+                region = Region(tag, start, line)
+                regions.append(region)
+                open_regions.append(region)
+                continue
+            open_tags = [r.tag for r in open_regions]
+            if tag not in open_tags:
+                self.problems.append(
+                    (line, "end::%s[] without an open tag::%s[]" % (tag, tag)))
+                continue
+            region = open_regions[len(open_tags) - 1 -
+                                  open_tags[::-1].index(tag)]
+            if region is not open_regions[-1]:
+                self.problems.append(
+                    (line, "end::%s[] before end::%s[] of the tag opened "
+                     "on line %d" % (tag, open_regions[-1].tag,
+                                     open_regions[-1].line)))
+            open_regions.remove(region)
+            region.end = data.rfind(b'\n', 0, match.start()) + 1
+            region.end_line = line
+        for region in open_regions:
+            self.problems.append(
+                (region.line, "tag::%s[] has no end::%s[]"
+                 % (region.tag, region.tag)))
+            region.end = len(data)
+
+    def read(self, tag):
+        """
+        Return the contents of the regions tagged tag, one after
+        another, without scanning the file again
+        """
+        data = map_file(self.fname)
+        try:
+            return b''.join(data[region.start:region.end]
+                            for region in self.regions[tag])
+        finally:
+            if isinstance(data, mmap.mmap):
+                data.close()
+
+    def read_lines(self, tag):
+        """
+        Return the lines of the regions tagged tag, one after another,
+        without the tag directives within them, as asciidoctor
+        includes them, as (line number, text) pairs
+        """
+        lines = []
+        data = map_file(self.fname)
+        try:
+            for region in self.regions[tag]:
+                text = data[region.start:region.end]
+                for offset, line in enumerate(text.splitlines(True)):
+                    if not tag_directive_re.search(line):
+                        lines.append((region.line + 1 + offset,
+                                      line.decode('utf-8')))
+        finally:
+            if isinstance(data, mmap.mmap):
+                data.close()
+        return lines
+
+    def to_dict(self):
+        return dict((tag, [region.to_dict() for region in regions])
+                    for tag, regions in self.regions.items())
+
+
+class Include(object):
+    """
+    An include directive of fname, on line line, of target, selecting
+    the regions tagged tags (an empty list if it selects none)
+    """
+
+    def __init__(self, fname, line, target, tags):
+        self.fname = fname
+        self.line = line
+        self.target = target
+        self.tags = tags
+
+    def path(self):
+        """
+        Return the path of the included file, which is relative to
+        the including one
+        """
+        return os.path.normpath(os.path.join(os.path.dirname(self.fname),
+                                             self.target))
+
+
+def include_tags(attributes):
+    """
+    Return the tags selected by the attributes of an include
+    directive, as a string
+    """
+    tags = []
+    for value in tag_attribute_re.findall(attributes):
+        tags.extend(t for t in re.split('[;,]', value.strip('"')) if t)
+    return tags
+
+
+def parse_include(line):
+    """
+    Return the target and the selected tags of an include directive
+    given as a line of text, or None if the line is not one
+    """
+    match = include_re.match(line.encode('utf-8'))
+    if match is None:
+        return None
+    target, attributes = [g.decode('utf-8') for g in match.groups()]
+    return target, include_tags(attributes)
+
+
+def scan_includes(fname):
+    """
+    Return the include directives of fname
+    """
+    includes = []
+    data = map_file(fname)
+    try:
+        lines = LineCounter(data)
+        for match in include_re.finditer(data):
+            target, attributes = [g.decode('utf-8') for g in match.groups()]
+            includes.append(Include(fname, lines.line_at(match.start()),
+                                    target, include_tags(attributes)))
+    finally:
+        if isinstance(data, mmap.mmap):
+            data.close()
+    return includes
+
+
+class TagChecker(object):
+    """
+    Checks the tag directives of files, and that the include
+    directives of AsciiDoc files only select tags that exist.
+
+    fragments maps directories of files holding one tagged region each,
+    named <tag>.adoc, to the file they were split from, so that
+    includes of these files can be checked against the tags of that
+    file, even before the fragments are written.  Directories are
+    compared by their real paths, so they may be given relative to the
+    current directory however the including files refer to them.
+
+    With warn_repeated, tags used more than once in a file are listed
+    in warnings, as (file, line, message) tuples like problems.
+    """
+
+    def __init__(self, fragments=None, warn_repeated=False):
+        self.fragments = dict((os.path.realpath(d), f)
+                              for d, f in (fragments or {}).items())
+        self.warn_repeated = warn_repeated
+        self.indexes = {}
+        self.problems = []
+        self.warnings = []
+        self.includes = 0
+
+    def index(self, fname):
+        """
+        Return the TagIndex of fname, scanning it the first time
+        """
+        fname = os.path.normpath(fname)
+        index = self.indexes.get(fname)
+        if index is None:
+            index = TagIndex.scan(fname)
+            self.indexes[fname] = index
+            for line, message in index.problems:
+                self.problems.append((fname, line, message))
+            if self.warn_repeated:
+                for line, message in index.repeated:
+                    self.warnings.append((fname, line, message))
+        return index
+
+    def check(self, fname):
+        """
+        Check the tags of the AsciiDoc file fname, and its includes
+        """
+        fname = os.path.normpath(fname)
+        self.index(fname)
+        for include in scan_includes(fname):
+            self.check_include(include)
+
+    def check_include(self, include):
+        self.includes += 1
+        if '{' in include.target:
+            # Depends on an attribute, which is not known here
+            return
+        path = include.path()
+        tags = [t for t in include.tags
+                if not t.startswith('!') and '*' not in t]
+        source = self.fragments.get(os.path.dirname(os.path.realpath(path)))
+        if source is not None and not include.tags:
+            tags = [os.path.splitext(os.path.basename(path))[0]]
+            path = source
+        if not tags:
+            return
+        if not os.path.exists(path):
+            self.problems.append((include.fname, include.line,
+                                  "included file %s does not exist" % path))
+            return
+        index = self.index(path)
+        for tag in tags:
+            if tag not in index.regions:
+                self.problems.append((include.fname, include.line,
+                                      "%s has no tag %s" % (path, tag)))
@@ -0,0 +1,189 @@
+#! /usr/bin/env python3
+
+# SPDX-FileCopyrightText: 2026 The P4 Language Consortium
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import argparse
+import concurrent.futures
+import json
+import os
+import subprocess
+import sys
+import time
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Document(object):
+    """
+    A document built by the Makefile in directory.  Its prepare targets
+    are made one after the other, before any of its targets, which are
+    made concurrently, so that they do not race to make the files they
+    have in common.
+    """
+
+    def __init__(self, name, directory, targets, prepare=()):
+        self.name = name
+        self.directory = directory
+        self.targets = targets
+        self.prepare = prepare
+
+
+documents = [
+    Document('spec', 'p4-16/spec', ['P4-16-spec.pdf', 'P4-16-spec.html'],
+             prepare=['grammar.trimmed.adoc', 'build/grammar-tags']),
+    Document('psa', 'p4-16/psa', ['PSA.pdf', 'PSA.html']),
+    Document('psa-charter', 'p4-16/psa', ['charter']),
+    Document('api-charter', 'api/charter', ['P4_API_WG_charter.pdf']),
+]
+
+
+parser = argparse.ArgumentParser(description="""
+Build the P4_16 language specification, the PSA specification and the
+charters at the same time, by running the targets of their Makefiles
+concurrently, and write how long each stage took to a JSON report.
+All the builds share one cache of rendered STEM expressions (see
+stem-cache.rb), so that each expression is rendered once.
+""")
+parser.add_argument('documents', metavar='document', nargs='*',
+                    help='the documents to build, from: %s; all of them '
+                    'by default' % ', '.join(d.name for d in documents))
+parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                    help='the number of stages to run at the same time '
+                    '(default: %(default)s)')
+parser.add_argument('-B', '--always-make', action='store_true',
+                    help='rebuild every target, even if it is up to date')
+parser.add_argument('-n', '--dry-run', action='store_true',
+                    help='print the stages without running them')
+parser.add_argument('--report', default='build-report.json',
+                    help='the JSON file to write the timings to '
+                    '(default: %(default)s)')
+parser.add_argument('--stem-cache', metavar='DIR',
+                    default=os.path.join(os.environ.get(
+                        'XDG_CACHE_HOME', os.path.expanduser('~/.cache')),
+                        'p4-spec', 'stem'),
+                    help='the directory of rendered STEM expressions '
+                    '(default: %(default)s)')
+
+
+class Stage(object):
+    """
+    Making some targets of a document, one after the other
+    """
+
+    def __init__(self, document, kind, targets):
+        self.document = document
+        self.kind = kind
+        self.targets = targets
+        self.start = None
+        self.elapsed = None
+        self.returncode = None
+        self.output = ''
+
+    def name(self):
+        return '%s:%s' % (self.document.name, self.kind)
+
+    def command(self, always_make):
+        return (['make', '-C', self.document.directory] +
+                (['-B'] if always_make else []) + self.targets)
+
+    def run(self, always_make, env, t0):
+        self.start = time.time() - t0
+        process = subprocess.run(self.command(always_make), cwd=root, env=env,
+                                 stdout=subprocess.PIPE,
+                                 stderr=subprocess.STDOUT)
+        self.elapsed = time.time() - t0 - self.start
+        self.returncode = process.returncode
+        self.output = process.stdout.decode('utf-8', 'replace')
+        return self
+
+    def to_dict(self, always_make):
+        return {'stage': self.name(),
+                'directory': self.document.directory,
+                'command': ' '.join(self.command(always_make)),
+                'start': round(self.start, 3),
+                'elapsed': round(self.elapsed, 3),
+                'returncode': self.returncode}
+
+
+def plan(selected):
+    """
+    Return the stages to run first, and those to run after them
+    """
+    prepare = []
+    build = []
+    for document in selected:
+        if document.prepare:
+            prepare.append(Stage(document, 'prepare', document.prepare))
+        for target in document.targets:
+            build.append(Stage(document, os.path.basename(target), [target]))
+    return prepare, build
+
+
+def run_stages(stages, jobs, always_make, env, t0):
+    """
+    Run the stages concurrently, printing the output of each one as it
+    finishes, and return whether they all succeeded
+    """
+    ok = True
+    with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(stage.run, always_make, env, t0)
+                   for stage in stages]
+        for future in concurrent.futures.as_completed(futures):
+            stage = future.result()
+            status = 'ok' if stage.returncode == 0 else \
+                'failed (exit status %d)' % stage.returncode
+            print("==> %s: %s in %.1f s" % (stage.name(), status,
+                                            stage.elapsed))
+            sys.stdout.write(stage.output)
+            sys.stdout.flush()
+            ok = ok and stage.returncode == 0
+    return ok
+
+
+def main():
+    args = parser.parse_args()
+    by_name = dict((d.name, d) for d in documents)
+    for name in args.documents:
+        if name not in by_name:
+            parser.error("unknown document %s" % name)
+    selected = [by_name[name] for name in args.documents] or documents
+    prepare, build = plan(selected)
+
+    if args.dry_run:
+        for stage in prepare + build:
+            print("%s: %s" % (stage.name(),
+                              ' '.join(stage.command(args.always_make))))
+        return
+
+    env = dict(os.environ, STEM_CACHE=os.path.abspath(args.stem_cache))
+    jobs = max(1, args.jobs)
+    t0 = time.time()
+    ok = run_stages(prepare, jobs, args.always_make, env, t0)
+    if ok:
+        ok = run_stages(build, jobs, args.always_make, env, t0)
+    else:
+        build = []
+    total = time.time() - t0
+
+    stages = [s for s in prepare + build if s.elapsed is not None]
+    report = {'started': time.strftime('%Y-%m-%dT%H:%M:%S%z',
+                                       time.localtime(t0)),
+              'jobs': jobs,
+              'stem_cache': env['STEM_CACHE'],
+              'elapsed': round(total, 3),
+              'stage_time': round(sum(s.elapsed for s in stages), 3),
+              'stages': [s.to_dict(args.always_make) for s in stages]}
+    with open(args.report, 'w') as outfile:
+        json.dump(report, outfile, indent=1)
+        outfile.write('\n')
+    print("%s: %d stages in %.1f s (%.1f s of stage time), report in %s"
+          % (parser.prog, len(stages), total, report['stage_time'],
+             args.report))
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+#! /usr/bin/env python3
+
+# SPDX-FileCopyrightText: 2026 The P4 Language Consortium
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import argparse
+import json
+import os
+import sys
+
+import adoctags
+
+parser = argparse.ArgumentParser(description="""
+Check that every tag::X[] directive in the given AsciiDoc files, and in
+the files they include by tag, has a matching end::X[] and that the
+regions nest properly, and that every include directive that selects
+regions by tag refers to a file with those tags.  A tag may mark
+more than one region of a file, as asciidoctor allows.  Directories
+are searched for .adoc files, other than in build directories.
+Problems are reported as file:line: message, and the exit status is 1
+if there are any.
+""")
+parser.add_argument('paths', metavar='path', nargs='+')
+parser.add_argument('--fragments', metavar='DIR=FILE', action='append',
+                    default=[],
+                    help='the files in DIR hold the tagged regions of FILE, '
+                    'one per file named <tag>.adoc; check includes of '
+                    'them against the tags of FILE')
+parser.add_argument('--warn-repeated', action='store_true',
+                    help='warn about tags that mark more than one region of '
+                    'a file, without failing')
+parser.add_argument('--index', metavar='JSON',
+                    help='write the byte offsets and line numbers of every '
+                    'tagged region found, by file and tag, to JSON')
+
+
+def find_adoc_files(paths):
+    fnames = []
+    for path in paths:
+        if not os.path.isdir(path):
+            fnames.append(path)
+            continue
+        for dirpath, dirnames, filenames in os.walk(path):
+            dirnames[:] = sorted(d for d in dirnames if d != 'build')
+            fnames.extend(os.path.join(dirpath, f) for f in sorted(filenames)
+                          if f.endswith('.adoc'))
+    return fnames
+
+
+def main():
+    args = parser.parse_args()
+    fragments = {}
+    for arg in args.fragments:
+        directory, sep, fname = arg.partition('=')
+        if not sep:
+            parser.error("--fragments needs DIR=FILE, not %s" % arg)
+        fragments[directory] = fname
+
+    checker = adoctags.TagChecker(fragments, args.warn_repeated)
+    try:
+        for fname in find_adoc_files(args.paths):
+            checker.check(fname)
+    except OSError as e:
+        sys.exit(str(e))
+
+    for fname, line, message in checker.problems:
+        print("%s:%d: %s" % (fname, line, message))
+    for fname, line, message in checker.warnings:
+        print("%s:%d: warning: %s" % (fname, line, message))
+
+    if args.index:
+        with open(args.index, 'w') as outfile:
+            json.dump(dict((fname, index.to_dict())
+                           for fname, index in checker.indexes.items()),
+                      outfile, indent=1)
+    if checker.problems:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
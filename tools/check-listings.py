@@ -0,0 +1,348 @@
+#! /usr/bin/env python3
+
+# SPDX-FileCopyrightText: 2026 The P4 Language Consortium
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import argparse
+import concurrent.futures
+import glob
+import hashlib
+import json
+import os
+import re
+import shlex
+import subprocess
+import sys
+
+import adoctags
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+parser = argparse.ArgumentParser(description="""
+Extract the P4 code listings of the specifications, the [source,p4]
+blocks of AsciiDoc files and the %%code blocks of the P4_14 .pt files,
+into a directory of snippets named by the hash of their contents, and
+run a checker on the snippets it has not checked before, several at a
+time.  Snippets that do not change are never checked again.  The
+checker is either 'balance', which checks that brackets match and that
+comments and strings end, or a command, which is given the snippet's
+file name and passes it by exiting with status 0.  The balance
+checker reports each problem at the line of the file it comes from,
+including files that the listing includes; a failing command is
+reported at the line the listing starts on.
+""")
+parser.add_argument('files', metavar='file', nargs='*',
+                    help='the files to extract listings from; by default, '
+                    'P4-16-spec.adoc, PSA.adoc and the P4_14 .pt files')
+parser.add_argument('--checker', default='balance',
+                    help="'balance' (the default), or a command such as "
+                    "'p4test --parse-only'")
+parser.add_argument('--dir', default=os.path.join(os.environ.get(
+                        'XDG_CACHE_HOME', os.path.expanduser('~/.cache')),
+                        'p4-spec', 'listings'),
+                    help='the directory of snippets and results '
+                    '(default: %(default)s)')
+parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                    help='the number of checks to run at the same time '
+                    '(default: %(default)s)')
+parser.add_argument('--expected', metavar='FILE',
+                    help='a file of the digests of listings that are known '
+                    'to fail, one per line, which do not count as failures')
+parser.add_argument('-v', '--verbose', action='store_true',
+                    help='also print the listings that pass, and the '
+                    'expected failures')
+
+default_files = (
+    [os.path.join(root, 'p4-16', 'spec', 'P4-16-spec.adoc'),
+     os.path.join(root, 'p4-16', 'psa', 'PSA.adoc')] +
+    sorted(glob.glob(os.path.join(root, 'p4-14', '*', 'tex', '*.pt'))))
+
+
+class Listing(object):
+    """
+    A listing of fname whose first line is line number line, made of
+    lines, as (file, line number, text) tuples: those of fname, and of
+    the files its include directives include
+    """
+
+    def __init__(self, fname, line, lines):
+        self.fname = fname
+        self.line = line
+        self.text = ''.join(text for _, _, text in lines)
+        self.origins = [(f, n) for f, n, _ in lines]
+        self.digest = hashlib.sha256(self.text.encode('utf-8')).hexdigest()
+
+    def origin(self, line):
+        """
+        Return the file and line number of line number line of the
+        text, counting from 0
+        """
+        if not self.origins:
+            return self.fname, self.line
+        return self.origins[min(line, len(self.origins) - 1)]
+
+
+# A listing block of an AsciiDoc file is a [source,p4] line, then a
+# line of four or more '-' (or '.'), then the listing, up to the same
+# line again.
+source_p4_re = re.compile(r"^\[source,\s*p4\s*[,\]]")
+delimiter_re = re.compile(r"^(-{4,}|\.{4,})\s*$")
+
+
+def adoc_listings(fname):
+    """
+    Generate the P4 listings of an AsciiDoc file, with the include
+    directives within them replaced by what they include
+    """
+    with open(fname) as infile:
+        number = 0
+        pending = False
+        for line in infile:
+            number += 1
+            if source_p4_re.match(line):
+                pending = True
+                continue
+            match = delimiter_re.match(line)
+            if not pending or not match:
+                pending = False
+                continue
+            pending = False
+            delimiter = match.group(1)
+            first = number + 1
+            lines = []
+            for line in infile:
+                number += 1
+                if line.rstrip() == delimiter:
+                    break
+                lines.extend(resolve_include(fname, number, line))
+            yield Listing(fname, first, lines)
+
+
+def resolve_include(fname, number, line):
+    """
+    Return the lines that line number number of fname stands for, as
+    (file, line number, text) tuples: what it includes if it is an
+    include directive, or else the line itself
+    """
+    parsed = adoctags.parse_include(line)
+    if parsed is None:
+        return [(fname, number, line)]
+    include = adoctags.Include(fname, number, *parsed)
+    path = include.path()
+    try:
+        if include.tags:
+            index = adoctags.TagIndex.scan(path)
+            lines = []
+            for tag in include.tags:
+                lines.extend(index.read_lines(tag))
+        else:
+            with open(path) as infile:
+                lines = list(enumerate(infile, 1))
+    except (OSError, KeyError):
+        # Leave it for the checker to report
+        return [(fname, number, line)]
+    if lines and not lines[-1][1].endswith('\n'):
+        lines[-1] = (lines[-1][0], lines[-1][1] + '\n')
+    return [(path, n, text) for n, text in lines]
+
+
+def pt_listings(fname):
+    """
+    Generate the %%code blocks of a P4_14 .pt file
+    """
+    with open(fname) as infile:
+        number = 0
+        for line in infile:
+            number += 1
+            if line.strip() != '%%code':
+                continue
+            first = number + 1
+            lines = []
+            for line in infile:
+                number += 1
+                if line.strip() == '%%endcode':
+                    break
+                lines.append((fname, number, line))
+            yield Listing(fname, first, lines)
+
+
+def listings(fnames):
+    for fname in fnames:
+        if fname.endswith('.pt'):
+            yield from pt_listings(fname)
+        else:
+            yield from adoc_listings(fname)
+
+
+# The balance checker
+
+# Strings may span lines
+token_re = re.compile(r'//[^\n]*|/\*.*?(\*/|\Z)|"(?:[^"\\]|\\.)*("|\Z)'
+                      r'|[()\[\]{}]|\n', re.DOTALL)
+closing = {')': '(', ']': '[', '}': '{'}
+
+
+def check_balance(text):
+    """
+    Return a list of the problems with the brackets, comments and
+    strings of text, as (line, message) pairs, with line counting from 0
+    """
+    problems = []
+    line = 0
+    opened = []
+    for match in token_re.finditer(text):
+        token = match.group(0)
+        if token == '\n':
+            line += 1
+        elif token.startswith('/*'):
+            if not match.group(1):
+                problems.append((line, "comment does not end"))
+            line += token.count('\n')
+        elif token.startswith('"'):
+            if not match.group(2):
+                problems.append((line, "string does not end"))
+            line += token.count('\n')
+        elif token.startswith('//'):
+            pass
+        elif token in closing:
+            if not opened or opened[-1][0] != closing[token]:
+                problems.append((line, "unmatched '%s'" % token))
+            else:
+                opened.pop()
+        else:
+            opened.append((token, line))
+    for token, opened_line in opened:
+        problems.append((opened_line, "'%s' is not closed" % token))
+    return problems
+
+
+def run_check(checker, fname):
+    """
+    Check the snippet in fname, and return its result: whether it
+    passed, the output of the checker command, and the problems the
+    balance checker found
+    """
+    if checker == 'balance':
+        with open(fname) as infile:
+            problems = check_balance(infile.read())
+        return {'ok': not problems, 'output': '', 'problems': problems}
+    try:
+        process = subprocess.run(shlex.split(checker) + [fname],
+                                 stdout=subprocess.PIPE,
+                                 stderr=subprocess.STDOUT)
+    except OSError as e:
+        return {'ok': False, 'output': '%s\n' % e, 'problems': []}
+    return {'ok': process.returncode == 0,
+            'output': process.stdout.decode('utf-8', 'replace'),
+            'problems': []}
+
+
+# The directory holds snippets/<hash>.p4, one file per distinct
+# listing, and results/<checker hash>/<hash>.json, the result of each
+# checker for it.
+
+def write_snippet(directory, listing):
+    fname = os.path.join(directory, 'snippets', listing.digest + '.p4')
+    if not os.path.exists(fname):
+        with open(fname + '.tmp', 'w') as outfile:
+            outfile.write(listing.text)
+        os.replace(fname + '.tmp', fname)
+    return fname
+
+
+def read_expected(fname):
+    """
+    Return the set of digests that a file of expected failures lists:
+    the first word of each line, apart from blank lines and comments
+    """
+    expected = set()
+    with open(fname) as infile:
+        for line in infile:
+            words = line.split()
+            if words and not words[0].startswith('#'):
+                expected.add(words[0])
+    return expected
+
+
+def main():
+    args = parser.parse_args()
+    directory = os.path.abspath(args.dir)
+    checker_key = hashlib.sha256(args.checker.encode('utf-8')).hexdigest()
+    results_dir = os.path.join(directory, 'results', checker_key[:16])
+    os.makedirs(os.path.join(directory, 'snippets'), exist_ok=True)
+    os.makedirs(results_dir, exist_ok=True)
+
+    # Extract the listings, and find the snippets that have no result
+    # for this checker yet
+    found = []
+    results = {}
+    todo = {}
+    try:
+        expected = read_expected(args.expected) if args.expected else set()
+        for listing in listings(args.files or default_files):
+            found.append(listing)
+            if listing.digest in results or listing.digest in todo:
+                continue
+            result = os.path.join(results_dir, listing.digest + '.json')
+            try:
+                with open(result) as infile:
+                    results[listing.digest] = json.load(infile)
+            except (OSError, ValueError):
+                todo[listing.digest] = write_snippet(directory, listing)
+    except OSError as e:
+        sys.exit("%s: %s" % (e.filename, e.strerror))
+
+    digests = list(todo)
+    snippets = [todo[d] for d in digests]
+    if args.jobs > 1 and len(snippets) > 1:
+        with concurrent.futures.ProcessPoolExecutor(args.jobs) as executor:
+            checked = list(executor.map(run_check,
+                                        [args.checker] * len(snippets),
+                                        snippets, chunksize=8))
+    else:
+        checked = [run_check(args.checker, s) for s in snippets]
+    for digest, result in zip(digests, checked):
+        results[digest] = result
+        fname = os.path.join(results_dir, digest + '.json')
+        with open(fname + '.tmp', 'w') as outfile:
+            json.dump(result, outfile)
+        os.replace(fname + '.tmp', fname)
+
+    failed = 0
+    known = 0
+    for listing in found:
+        result = results[listing.digest]
+        fname = os.path.relpath(listing.fname)
+        if result['ok']:
+            if listing.digest in expected:
+                print("%s:%d: listing passes, but is expected to fail; "
+                      "remove %s from %s" % (fname, listing.line,
+                                             listing.digest, args.expected))
+            elif args.verbose:
+                print("%s:%d: ok" % (fname, listing.line))
+            continue
+        if listing.digest in expected:
+            known += 1
+            if not args.verbose:
+                continue
+            print("%s:%d: expected failure" % (fname, listing.line))
+        else:
+            failed += 1
+        for line, message in result['problems']:
+            origin, number = listing.origin(line)
+            print("%s:%d: %s" % (os.path.relpath(origin), number, message))
+        if not result['problems']:
+            print("%s:%d: listing fails %s (%s)" % (
+                fname, listing.line, args.checker,
+                os.path.join(directory, 'snippets', listing.digest + '.p4')))
+            sys.stdout.write(result['output'])
+    print("%d listings, %d distinct, %d checked, %d failed, %d expected "
+          "failures" % (len(found), len(set(l.digest for l in found)),
+                        len(todo), failed, known))
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
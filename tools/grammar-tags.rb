@@ -0,0 +1,89 @@
+# SPDX-FileCopyrightText: 2026 The P4 Language Consortium
+#
+# SPDX-License-Identifier: Apache-2.0
+
+# Serves includes of tagged regions of a grammar file, such as
+#
+#   include::grammar.adoc[tag=p4program]
+#
+# from the files that trim-asciidoc-tag-comments.py --split-tags writes,
+# one per tag, so that asciidoctor does not read and scan the whole
+# grammar for each of the includes.  The sources keep including the
+# grammar itself, and render the same without this extension.  Load it
+# with the directory of the tag files:
+#
+#   asciidoctor -r ../../tools/grammar-tags.rb \
+#       -a grammar-tags=build/grammar-tags ...
+#
+# The grammar file is any file named grammar.adoc, unless the
+# grammar-tags-source attribute gives another name.  The tag files are
+# used if their directory was updated after the grammar changed; an
+# include of a tag whose file is missing or out of date, or of several
+# tags, reads the tagged regions from the grammar file instead, as
+# asciidoctor would.
+
+require 'asciidoctor'
+require 'asciidoctor/extensions'
+
+class GrammarTagsIncludeProcessor < Asciidoctor::Extensions::IncludeProcessor
+  # A tag comment line, as asciidoctor finds them
+  TAG_LINE_RE = /\b(tag|end)::(\S+?)\[\](?=$|[ \r])/
+
+  # Older versions of asciidoctor pass the target only
+  def handles?(*args)
+    doc, target = args.size > 1 ? args : [nil, args[0]]
+    File.basename(target) == File.basename(source(doc)) &&
+      (doc.nil? || doc.attr?('grammar-tags'))
+  end
+
+  def process(doc, reader, target, attributes)
+    path = File.expand_path(target, reader.dir)
+    tags = (attributes['tag'] || attributes['tags'] || '').split(/[;,]/)
+    if tags.empty?
+      lines = File.read(path)
+    elsif tags.any? { |tag| tag !~ /\A[\w-]+\z/ }
+      # Wildcards and negated tags are not supported
+      Asciidoctor::LoggerManager.logger.warn(
+        "#{target}: only tag names are supported, not #{tags.join(';')}")
+      lines = tagged_lines(path, tags)
+    else
+      dir = File.expand_path(doc.attr('grammar-tags'), doc.base_dir)
+      fragment = File.join(dir, tags[0] + '.adoc')
+      if tags.size == 1 && File.file?(fragment) &&
+         File.mtime(dir) >= File.mtime(path)
+        return reader.push_include(File.read(fragment), fragment, target, 1,
+                                   attributes)
+      end
+      lines = tagged_lines(path, tags)
+    end
+    reader.push_include(lines, path, target, 1, attributes)
+  end
+
+  def source(doc)
+    (doc && doc.attr('grammar-tags-source')) || 'grammar.adoc'
+  end
+
+  # The lines of the regions of fname tagged with one of tags, without
+  # the tag comment lines
+  def tagged_lines(fname, tags)
+    open_tags = []
+    lines = []
+    File.foreach(fname) do |line|
+      if (match = TAG_LINE_RE.match(line))
+        kind, tag = match.captures
+        if kind == 'tag'
+          open_tags << tag
+        else
+          open_tags.delete_at(open_tags.rindex(tag) || open_tags.size)
+        end
+        next
+      end
+      lines << line.chomp if open_tags.any? { |tag| tags.include?(tag) }
+    end
+    lines
+  end
+end
+
+Asciidoctor::Extensions.register do
+  include_processor GrammarTagsIncludeProcessor
+end
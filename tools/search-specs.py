@@ -0,0 +1,405 @@
+#! /usr/bin/env python3
+
+# SPDX-FileCopyrightText: 2026 The P4 Language Consortium
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import argparse
+import array
+import bisect
+import fnmatch
+import glob
+import hashlib
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import time
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+parser = argparse.ArgumentParser(description="""
+Search the sources of the specifications: P4-16-spec.adoc,
+grammar.adoc, PSA.adoc and the .pt files of the P4_14 specifications,
+of every version.  Prints the lines that contain all the words of the
+query, ignoring case; a query word ending in '*' matches the words
+that start with it, and a quoted query word, such as '"header stack"',
+matches those words in a row, even across lines.  The search uses an
+index of the position of every word, which is brought up to date first
+for the files that changed.
+""")
+parser.add_argument('query', nargs='*',
+                    help='words, prefixes such as "pars*", and phrases '
+                    'in quotes')
+parser.add_argument('--version', action='append', metavar='PATTERN',
+                    help='only search files of versions matching PATTERN, '
+                    'such as v1.0.4 or "v1.0.*"; may be repeated')
+parser.add_argument('--doc', action='append', metavar='PATTERN',
+                    help='only search the documents matching PATTERN: '
+                    'p4-16, p4-16-grammar, psa or p4-14; may be repeated')
+parser.add_argument('--dir', default=os.path.join(os.environ.get(
+                        'XDG_CACHE_HOME', os.path.expanduser('~/.cache')),
+                        'p4-spec', 'search'),
+                    help='the directory of the index '
+                    '(default: %(default)s)')
+parser.add_argument('--limit', type=int, default=50,
+                    help='print at most this many lines; 0 prints them all '
+                    '(default: %(default)s)')
+parser.add_argument('-l', '--files-with-matches', action='store_true',
+                    help='only print the files with matches, and how many')
+parser.add_argument('--rebuild', action='store_true',
+                    help='index every file again')
+parser.add_argument('--stats', action='store_true',
+                    help='print the size of the index, and how long the '
+                    'search took')
+
+word_re = re.compile(r"[A-Za-z0-9_]+")
+revnumber_re = re.compile(r"^:revnumber:\s*(\S+)", re.MULTILINE)
+
+magic = b'P4SRCH01'
+
+
+def sources():
+    """Return the files to index, as (path, document, version) triples.
+    The version of an AsciiDoc specification is its revnumber, which
+    grammar.adoc shares with P4-16-spec.adoc, and that of a P4_14 file
+    is the name of its directory."""
+    def revnumber(fname):
+        with open(fname) as infile:
+            match = revnumber_re.search(infile.read(4096))
+        return match.group(1) if match else ''
+
+    spec = os.path.join(root, 'p4-16', 'spec', 'P4-16-spec.adoc')
+    psa = os.path.join(root, 'p4-16', 'psa', 'PSA.adoc')
+    result = [
+        (spec, 'p4-16', revnumber(spec)),
+        (os.path.join(root, 'p4-16', 'spec', 'grammar.adoc'),
+         'p4-16-grammar', revnumber(spec)),
+        (psa, 'psa', revnumber(psa)),
+    ]
+    for fname in sorted(glob.glob(os.path.join(root, 'p4-14', '*', 'tex',
+                                               '*.pt'))):
+        version = os.path.basename(os.path.dirname(os.path.dirname(fname)))
+        result.append((fname, 'p4-14', version))
+    return result
+
+
+# Each file is tokenized once per content, into tokens/<sha1>.json in
+# the index directory: its words, lowercased, in order, and for each
+# line, the number of words before it.
+
+def tokenize(text):
+    words = []
+    line_starts = []
+    for line in text.split('\n'):
+        line_starts.append(len(words))
+        words.extend(w.lower() for w in word_re.findall(line))
+    return {'words': words, 'line_starts': line_starts}
+
+
+def file_tokens(directory, data, use_cache=True):
+    digest = hashlib.sha1(data).hexdigest()
+    fname = os.path.join(directory, 'tokens', digest + '.json')
+    try:
+        if use_cache:
+            with open(fname) as infile:
+                return digest, json.load(infile), False
+    except (OSError, ValueError):
+        pass
+    tokens = tokenize(data.decode('utf-8', 'replace'))
+    os.makedirs(os.path.dirname(fname), exist_ok=True)
+    with open(fname + '.tmp', 'w') as outfile:
+        json.dump(tokens, outfile, separators=(',', ':'))
+    os.replace(fname + '.tmp', fname)
+    return digest, tokens, True
+
+
+# The index file is the magic number, the length of a JSON header, the
+# header, and arrays of native unsigned ints, each starting at a
+# multiple of 8 bytes:
+#
+#   term_offsets   uint32, n + 1: where each term starts in term_bytes
+#   term_bytes     the terms, UTF-8, sorted
+#   postings_index uint32, n + 1: where the postings of each term start
+#   postings       uint64: for each term, sorted, file << 32 | position
+#   line_starts    uint32: for each file, in turn, the position of the
+#                  first word of each line
+#
+# The header lists the files, with their document, version, hash,
+# modification time and size, and where their line_starts are, and the
+# offset and length of each array.  Searching reads only the header
+# and the parts of the arrays it needs, in place.
+
+def write_index(fname, files, per_file):
+    postings = {}
+    for number, tokens in enumerate(per_file):
+        base = number << 32
+        for position, word in enumerate(tokens['words']):
+            entry = postings.get(word)
+            if entry is None:
+                postings[word] = entry = []
+            entry.append(base | position)
+    terms = sorted(postings, key=lambda t: t.encode('utf-8'))
+    term_offsets = array.array('I', [0])
+    term_bytes = bytearray()
+    postings_index = array.array('I', [0])
+    keys = array.array('Q')
+    for term in terms:
+        term_bytes += term.encode('utf-8')
+        term_offsets.append(len(term_bytes))
+        keys.extend(postings[term])
+        postings_index.append(len(keys))
+    line_starts = array.array('I')
+    for entry, tokens in zip(files, per_file):
+        entry['line_starts'] = [len(line_starts), len(tokens['line_starts'])]
+        entry['words'] = len(tokens['words'])
+        line_starts.extend(tokens['line_starts'])
+
+    arrays = [('term_offsets', term_offsets.tobytes()),
+              ('term_bytes', bytes(term_bytes)),
+              ('postings_index', postings_index.tobytes()),
+              ('postings', keys.tobytes()),
+              ('line_starts', line_starts.tobytes())]
+    header = {'files': files, 'terms': len(terms), 'arrays': {}}
+    # The header gives the offsets of the arrays, which depend on the
+    # length of the header: leave room for the offsets, and pad
+    offset = 0
+    for name, data in arrays:
+        header['arrays'][name] = [offset, len(data)]
+        offset += (len(data) + 7) // 8 * 8
+    text = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    start = (len(magic) + 8 + len(text) + 64 + 7) // 8 * 8
+    for name, _ in arrays:
+        header['arrays'][name][0] += start
+    text = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    text += b' ' * (start - len(magic) - 8 - len(text))
+
+    with open(fname + '.tmp', 'wb') as outfile:
+        outfile.write(magic + struct.pack('<Q', len(text)) + text)
+        for name, data in arrays:
+            outfile.write(data + b'\0' * (-len(data) % 8))
+    os.replace(fname + '.tmp', fname)
+
+
+class Index(object):
+    """An index file, mapped into memory."""
+
+    def __init__(self, fname):
+        with open(fname, 'rb') as infile:
+            self.map = mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.map[:len(magic)] != magic:
+            raise ValueError("%s is not an index" % (fname))
+        length, = struct.unpack_from('<Q', self.map, len(magic))
+        start = len(magic) + 8
+        self.header = json.loads(self.map[start:start + length])
+        self.files = self.header['files']
+        self.terms = self.header['terms']
+        view = memoryview(self.map)
+        self.arrays = {}
+        for name, (offset, size) in self.header['arrays'].items():
+            data = view[offset:offset + size]
+            if name != 'term_bytes':
+                data = data.cast('Q' if name == 'postings' else 'I')
+            self.arrays[name] = data
+
+    def close(self):
+        self.arrays = {}
+        self.map.close()
+
+    def term(self, i):
+        offsets = self.arrays['term_offsets']
+        return bytes(self.arrays['term_bytes'][offsets[i]:offsets[i + 1]])
+
+    def lower_bound(self, word):
+        """The number of the first term not less than word."""
+        lo, hi = 0, self.terms
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.term(mid) < word:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def term_range(self, word, prefix=False):
+        """The numbers of the terms equal to word, or starting with it."""
+        word = word.encode('utf-8')
+        first = self.lower_bound(word)
+        if not prefix:
+            if first < self.terms and self.term(first) == word:
+                return range(first, first + 1)
+            return range(first, first)
+        last = first
+        while last < self.terms and self.term(last).startswith(word):
+            last += 1
+        return range(first, last)
+
+    def postings(self, terms):
+        """The file << 32 | position keys of the terms, as a set."""
+        index = self.arrays['postings_index']
+        keys = self.arrays['postings']
+        result = set()
+        for i in terms:
+            result.update(keys[index[i]:index[i + 1]])
+        return result
+
+    def line_of(self, file_number, position):
+        """The line number, from 1, of a word of a file."""
+        start, count = self.files[file_number]['line_starts']
+        starts = self.arrays['line_starts'][start:start + count]
+        return bisect.bisect_right(starts, position)
+
+
+def update_index(directory, rebuild=False):
+    """Bring the index in directory up to date with the sources, and
+    return it with the number of files tokenized again."""
+    fname = os.path.join(directory, 'index.bin')
+    os.makedirs(directory, exist_ok=True)
+    old = {}
+    if not rebuild:
+        try:
+            index = Index(fname)
+            old = dict((f['path'], f) for f in index.files)
+            index.close()
+        except (OSError, ValueError):
+            pass
+    current = sources()
+    stale = rebuild or len(old) != len(current)
+    states = []
+    for path, doc, version in current:
+        stat = os.stat(path)
+        states.append((stat.st_mtime_ns, stat.st_size))
+        entry = old.get(path)
+        if (entry is None or entry['doc'] != doc or
+                entry['version'] != version or
+                (entry['mtime_ns'], entry['size']) != states[-1]):
+            stale = True
+    if not stale:
+        return Index(fname), 0
+
+    files = []
+    per_file = []
+    tokenized = 0
+    for (path, doc, version), (mtime_ns, size) in zip(current, states):
+        with open(path, 'rb') as infile:
+            data = infile.read()
+        digest, tokens, new = file_tokens(directory, data, not rebuild)
+        tokenized += new
+        files.append({'path': path, 'doc': doc, 'version': version,
+                      'sha1': digest, 'mtime_ns': mtime_ns, 'size': size})
+        per_file.append(tokens)
+    write_index(fname, files, per_file)
+    prune_tokens(directory, set(f['sha1'] for f in files))
+    return Index(fname), tokenized
+
+
+def prune_tokens(directory, digests):
+    for fname in glob.glob(os.path.join(directory, 'tokens', '*.json')):
+        if os.path.basename(fname)[:-len('.json')] not in digests:
+            try:
+                os.remove(fname)
+            except OSError:
+                pass
+
+
+def parse_query(words):
+    """Return the parts of a query, each a list of (word, prefix)
+    pairs to find in a row."""
+    parts = []
+    for arg in words:
+        for phrase in re.findall(r'"([^"]*)"|(\S+)', arg):
+            text = phrase[0] or phrase[1]
+            tokens = []
+            for match in re.finditer(r"([A-Za-z0-9_]+)(\*?)", text):
+                tokens.append((match.group(1).lower(), bool(match.group(2))))
+            if tokens:
+                parts.append(tokens)
+    return parts
+
+
+def search(index, parts, selected):
+    """Return the (file, line) pairs, from selected files, with a match
+    of every part of the query, sorted."""
+    lines = None
+    for part in parts:
+        # The keys where the phrase starts: those of its first word,
+        # kept if each following word comes right after
+        starts = None
+        for offset, (word, prefix) in enumerate(part):
+            keys = index.postings(index.term_range(word, prefix))
+            if starts is None:
+                starts = set(k for k in keys if (k >> 32) in selected)
+            else:
+                starts = set(k for k in starts if k + offset in keys)
+            if not starts:
+                break
+        found = set((k >> 32, index.line_of(k >> 32, k & 0xffffffff))
+                    for k in starts)
+        lines = found if lines is None else lines & found
+        if not lines:
+            return []
+    return sorted(lines or [])
+
+
+def select_files(index, versions, docs):
+    selected = set()
+    for number, f in enumerate(index.files):
+        if versions and not any(fnmatch.fnmatch(f['version'], v)
+                                for v in versions):
+            continue
+        if docs and not any(fnmatch.fnmatch(f['doc'], d) for d in docs):
+            continue
+        selected.add(number)
+    return selected
+
+
+def main():
+    args = parser.parse_args()
+    started = time.time()
+    try:
+        index, tokenized = update_index(args.dir, args.rebuild)
+    except OSError as e:
+        sys.exit("%s: %s" % (e.filename, e.strerror))
+    updated = time.time()
+    selected = select_files(index, args.version, args.doc)
+    parts = parse_query(args.query)
+    matches = search(index, parts, selected) if parts else []
+    searched = time.time()
+
+    if args.files_with_matches:
+        counts = {}
+        for number, line in matches:
+            counts[number] = counts.get(number, 0) + 1
+        for number, count in sorted(counts.items()):
+            f = index.files[number]
+            print("%s (%s %s): %d lines" % (os.path.relpath(f['path']),
+                                            f['doc'], f['version'], count))
+    else:
+        texts = {}
+        shown = matches if not args.limit else matches[:args.limit]
+        for number, line in shown:
+            f = index.files[number]
+            if number not in texts:
+                with open(f['path'], encoding='utf-8',
+                          errors='replace') as infile:
+                    texts[number] = infile.read().split('\n')
+            print("%s:%d: %s" % (os.path.relpath(f['path']), line,
+                                 texts[number][line - 1].strip()))
+        if len(shown) < len(matches):
+            print("... %d more lines (--limit 0 prints them all)"
+                  % (len(matches) - len(shown)))
+    if args.stats:
+        print("%d files (%d tokenized again), %d terms, %d word positions; "
+              "index %.1f ms, search %.1f ms"
+              % (len(index.files), tokenized, index.terms,
+                 len(index.arrays['postings']),
+                 (updated - started) * 1000, (searched - updated) * 1000),
+              file=sys.stderr)
+    if parts and not matches:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+# SPDX-FileCopyrightText: 2026 The P4 Language Consortium
+#
+# SPDX-License-Identifier: Apache-2.0
+
+# Keeps what asciidoctor-mathematical renders for each STEM expression
+# in a cache directory, named by a hash of the expression and of the
+# rendering options, so that an expression is rendered once, however
+# many builds, documents and backends use it.  Load it after
+# asciidoctor-mathematical:
+#
+#   asciidoctor -r asciidoctor-mathematical -r ../../tools/stem-cache.rb ...
+#
+# The cache is in the directory named by the STEM_CACHE environment
+# variable; without it, expressions are rendered as usual.  Reading an
+# entry marks it as recently used, and once the entries take more than
+# STEM_CACHE_MAX_MB megabytes (100 by default), the least recently used
+# ones are removed.
+
+require 'digest'
+require 'fileutils'
+require 'mathematical'
+
+module StemCache
+  def initialize(*args)
+    super
+    @stem_cache_options = args.inspect
+  end
+
+  def parse(maths)
+    dir = ENV['STEM_CACHE']
+    return super if dir.nil? || dir.empty? || !maths.is_a?(String)
+    file = File.join(dir, Digest::SHA256.hexdigest(
+                            @stem_cache_options + "\0" + maths))
+    begin
+      result = Marshal.load(File.binread(file))
+      now = Time.now
+      File.utime(now, now, file)
+      return result
+    rescue StandardError
+      # Not rendered yet, or unreadable: render it again
+    end
+    result = super
+    return result if result[:exception]
+    FileUtils.mkdir_p(dir)
+    # Write to a temporary file first, so that a build running at the
+    # same time never reads it half written.
+    tmp = "#{file}.#{Process.pid}.tmp"
+    File.binwrite(tmp, Marshal.dump(result))
+    File.rename(tmp, file)
+    evict(dir)
+    result
+  end
+
+  # Remove the least recently used entries until the rest fit in the
+  # size limit
+  def evict(dir)
+    limit = (ENV['STEM_CACHE_MAX_MB'] || '100').to_f * 1024 * 1024
+    entries = Dir.glob(File.join(dir, '*')).map do |f|
+      [f, File.stat(f)] unless f.end_with?('.tmp')
+    rescue SystemCallError
+      nil  # Removed by another build
+    end.compact
+    total = entries.sum { |_, stat| stat.size }
+    entries.sort_by { |_, stat| stat.mtime }.each do |f, stat|
+      break if total <= limit
+      begin
+        File.delete(f)
+      rescue SystemCallError
+        # Already removed by another build
+      end
+      total -= stat.size
+    end
+  end
+end
+
+Mathematical.prepend(StemCache)